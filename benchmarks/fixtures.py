@@ -0,0 +1,202 @@
+import os
+import tempfile
+
+# Fixtures and caches are kept apart from the survey data unless set otherwise
+os.environ.setdefault("MMS_SURVEY_DATA_DIR", os.path.join(tempfile.gettempdir(), "mms_survey_benchmarks"))
+
+import h5py as h5
+import numpy as np
+import astropy.units as u
+
+import lib
+from lib.numeric import merge_timeline
+from lib.utils import read_num_intervals, read_trange, write_data
+
+# Synthetic MMS-like data in the data/h5 layout written by the collect scripts
+version = 4
+seed = 0
+# Interval durations benchmarked; the survey interval closest to each is used
+lengths = [1, 6, 18] * u.h
+# Intervals of the FigA1 lobe events, needed to build its event catalog
+event_intervals = [267, 288, 300, 327, 352]
+
+# Cadences in seconds: FGM survey, EDP fast, FPI fast, FEEPS survey, MEC survey, OMNI HRO
+cadence = dict(fgm=1 / 16, edp=1 / 32, fpi=4.5, feeps=2.5, mec=30, omni=60)
+fpi_channels = 32
+feeps_channels = dict(
+    ion=np.array([76.8, 95.4, 114.1, 133.0, 153.7, 177.6, 205.1, 236.7, 273.2, 315.4, 363.8, 419.7, 484.2, 558.6]),
+    elc=np.array([51.9, 70.6, 89.4, 107.1, 125.2, 146.5, 171.3, 200.2, 234.0, 273.4, 319.4, 373.2, 436.0, 509.2]),
+)
+feeps_eyes = dict(ion=[6, 7, 8], elc=[1, 2, 3, 4, 5, 9, 10, 11, 12])
+# Tetrahedron vertices about the barycenter
+tetrahedron = np.array([[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]) * 10 * u.km
+
+
+def benchmark_intervals():
+    trange = read_trange(slice(None), dtype="datetime64[ns]").astype("f8")
+    durations = (trange[:, 1] - trange[:, 0]) * u.ns
+    return [int(np.argmin(np.abs(durations - length))) for length in lengths]
+
+
+def times(interval, dt, offset=0):
+    start, stop = read_trange(interval, dtype="datetime64[ns]").astype("f8")
+    return np.arange(start + offset, stop, dt * 1e9)
+
+
+def random_walk(rng, shape, step, start=0):
+    return start + np.cumsum(rng.normal(0, step, shape), axis=0)
+
+
+def orbit(t):
+    # Slow pass through the tail plasma sheet around X = -15 RE
+    phase = 2 * np.pi * (t - t[0]) / 2.7 / 86400e9
+    R = np.stack([-15 + 3 * np.sin(phase), 8 * np.sin(phase / 3), 2 * np.cos(phase)], axis=1)
+    return (R * u.R_earth).to(u.km)
+
+
+def fgm(rng, probe, interval):
+    t = times(interval, cadence["fgm"], offset=probe * 7e6)
+    B = random_walk(rng, (len(t), 3), 0.05, start=[10, 0, 2]) * u.nT
+    return dict(t=t, B_gsm=B, R_gsm=orbit(t) + tetrahedron[probe - 1])
+
+
+def edp(rng, probe, interval):
+    t = times(interval, cadence["edp"], offset=probe * 3e6)
+    E = rng.normal(0, 1, (len(t), 3)) * u.Unit("mV/m")
+    return dict(t=t, E_gsm=E, E_gsm_err=np.abs(E) / 10, bitmask=np.zeros(len(t), dtype="i8"))
+
+
+def fpi_moms(rng, probe, interval, species):
+    # DIS and DES share their fast-survey times, as Fig2 asserts
+    t = times(interval, cadence["fpi"], offset=2e9)
+    n = len(t)
+    energy = np.logspace(np.log10(2e-3), np.log10(28 if species == "ion" else 27), fpi_channels) * u.keV
+    N = np.exp(random_walk(rng, n, 0.02, start=np.log(0.3))) * u.Unit("cm-3")
+    kT = (5 if species == "ion" else 1) * u.keV
+    # Maxwellian energy spectra with noise
+    f = (
+        N[:, np.newaxis].value
+        * 1e7
+        * (energy / kT) ** 2
+        * np.exp(-energy / kT)
+        * rng.lognormal(0, 0.3, (n, fpi_channels))
+    )
+    P = (N * kT).to(u.Unit("keV cm-3"))
+    return dict(
+        t=t,
+        f_omni=f.value * u.Unit("cm-2 s-1 sr-1"),
+        f_omni_energy=np.tile(energy, (n, 1)),
+        N=N,
+        V_gsm=rng.normal(0, 100, (n, 3)) * u.km / u.s,
+        V_gse=rng.normal(0, 100, (n, 3)) * u.km / u.s,
+        P_tensor_gse=P[:, np.newaxis, np.newaxis] * np.eye(3),
+        b_gse=rng.normal(0, 1, (n, 3)),
+        Vsc=rng.uniform(2e-3, 8e-3, n) * u.keV,
+        idx=np.zeros(n, dtype="i8"),
+    )
+
+
+def feeps(rng, probe, interval, species):
+    t = times(interval, cadence["feeps"])
+    energy = feeps_channels[species] * u.keV
+    # Power-law tails seen by each eye, collapsed as in lib.load.feeps
+    eyes = len(feeps_eyes[species])
+    flux = 1e6 * (energy.value / 50) ** -3 * rng.lognormal(0, 0.5, (eyes, len(t), len(energy)))
+    flux[0][rng.uniform(size=flux.shape[1:]) < 0.05] = np.nan
+    f_omni = np.nanmean(flux, axis=0) * u.Unit("cm-2 s-1 sr-1")
+    return dict(t=t, f_omni_energy=energy, f_omni=f_omni, f_omni_avg=f_omni)
+
+
+def mec(rng, probe, interval):
+    t = times(interval, cadence["mec"])
+    dipole_tilt = (20 * np.sin(2 * np.pi * (t - t[0]) / 86400e9) + rng.uniform(-10, 10)) * u.deg
+    return dict(t=t, dipole_tilt=dipole_tilt, kp=np.full(len(t), 2.0), dst=np.full(len(t), -10.0))
+
+
+def omni(rng, interval):
+    t = times(interval, cadence["omni"])
+    n = len(t)
+    B = rng.normal(0, 5, (n, 3)) * u.nT
+    V = rng.normal([-400, 0, 0], [50, 20, 20], (n, 3)) * u.km / u.s
+    data = dict(t=t, Bx_gse=B[:, 0], By_gse=B[:, 1], Bz_gse=B[:, 2], By_gsm=B[:, 1], Bz_gsm=B[:, 2])
+    data.update(Vp=np.linalg.norm(V, axis=1), Vx=V[:, 0], Vy=V[:, 1], Vz=V[:, 2])
+    data.update(Np=rng.uniform(1, 10, n) * u.Unit("cm-3"), Pp=rng.uniform(0.5, 6, n) * u.nPa)
+    for key in ["SYM_H", "SYM_D", "ASY_H", "ASY_D"]:
+        data[key] = rng.normal(0, 20, n) * u.nT
+    return data
+
+
+def write_omni(segments):
+    def write(fname, data):
+        with h5.File(fname, "w") as h5f:
+            for key, value in data.items():
+                if isinstance(value, u.Quantity):
+                    h5f.create_dataset(key, data=value.value).attrs["unit"] = str(value.unit)
+                else:
+                    h5f.create_dataset(key, data=value)
+
+    (lib.h5_dir / "omni").mkdir(parents=True, exist_ok=True)
+    for interval, data in segments.items():
+        write(lib.h5_dir / "omni" / f"interval_{interval}.h5", data)
+
+    # Intervals outside the fixture own no rows of the timeline
+    timeline, rows = merge_timeline([segments.get(i, {}) for i in range(read_num_intervals())])
+    write(lib.h5_dir / "omni" / "timeline.h5", timeline | dict(rows=rows))
+
+
+def stamp():
+    return repr((version, seed, benchmark_intervals(), event_intervals))
+
+
+def link():
+    # Same layout as scripts/link_files.py, stamped with the fixture it links
+    with h5.File(lib.data_file, "w") as h5f:
+        h5f.attrs["fixture"] = stamp()
+        for root, dirs, files in os.walk(lib.h5_dir):
+            if len(dirs) > 0:
+                continue
+            path = os.path.relpath(root, lib.h5_dir)
+            for f in files:
+                h5f[f"{path}/{os.path.splitext(f)[0]}"] = h5.ExternalLink(f"{root}/{f}", "/")
+        for f in os.listdir(lib.postprocess_dir):
+            h5f[f"/postprocess/{os.path.splitext(f)[0]}"] = h5.ExternalLink(f"{lib.postprocess_dir}/{f}", "/")
+        h5f["analysis"] = h5.ExternalLink(lib.analysis_file, "/")
+
+
+def make_fixture(force=False):
+    r"""Write the fixture once per version, lengths and seed; returns the benchmark intervals"""
+    intervals = benchmark_intervals()
+    if not force and lib.data_file.exists():
+        with h5.File(lib.data_file, "r") as h5f:
+            if h5f.attrs.get("fixture") == stamp():
+                return intervals
+
+    print(f"Writing fixture for intervals {intervals} to {lib.data_dir}", flush=True)
+    segments = {}
+    for interval in dict.fromkeys(intervals + event_intervals):
+        full = interval in intervals
+        rng = np.random.default_rng([seed, interval])
+        for probe in range(1, 5):
+            data = {}
+            if full:
+                data.update(fgm=fgm(rng, probe, interval), edp=edp(rng, probe, interval))
+            if full or probe == 1:
+                for species in ["ion", "elc"]:
+                    data[f"{species}-fpi-moms"] = fpi_moms(rng, probe, interval, species)
+                    data[f"{species}-feeps"] = feeps(rng, probe, interval, species)
+            if full and probe == 1:
+                data["mec"] = mec(rng, probe, interval)
+            for instrument, values in data.items():
+                (lib.h5_dir / f"mms{probe}" / instrument).mkdir(parents=True, exist_ok=True)
+                h5.File(lib.h5_dir / f"mms{probe}" / instrument / f"interval_{interval}.h5", "w").close()
+                write_data(probe, interval, instrument, values)
+        if full:
+            segments[interval] = omni(rng, interval)
+
+    write_omni(segments)
+    link()
+    return intervals
+
+
+if __name__ == "__main__":
+    make_fixture(force=True)
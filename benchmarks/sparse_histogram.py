@@ -0,0 +1,59 @@
+import pickle
+import time
+
+import numpy as np
+import astropy.units as u
+
+from lib.stats import Bins, SparseHistogram, histogramdd
+
+# Synthetic MMS-like orbit segments: 4.5 s cadence, ~1-day elliptical orbit
+N_int = 200
+N_channels = 8
+rng = np.random.default_rng(0)
+
+X_bins = Bins(np.arange(-30, 10 + 0.5, 0.5) * u.R_earth)
+Y_bins = Bins(np.arange(-30, 30 + 0.5, 0.5) * u.R_earth)
+Z_bins = Bins(np.arange(-10, 10 + 0.5, 0.5) * u.R_earth)
+bins = (X_bins, Y_bins, Z_bins)
+
+
+def orbit_track(interval):
+    duration = rng.uniform(2, 12) * 3600
+    t = np.arange(0, duration, 4.5) + rng.uniform(0, 365 * 86400)
+    phase = 2 * np.pi * t / 86400 / 2.7
+    local_time = 2 * np.pi * t / 86400 / 365
+    r = 15 / (1 + 0.7 * np.cos(phase))
+    X = r * np.cos(phase + local_time)
+    Y = r * np.sin(phase + local_time)
+    Z = 2 * np.sin(phase) + rng.normal(0, 0.05, len(t))
+    weights = rng.normal(size=(len(t), N_channels))
+    return (X * u.R_earth, Y * u.R_earth, Z * u.R_earth), weights
+
+
+tracks = [orbit_track(i) for i in range(N_int)]
+print(f"{N_int} intervals, {sum(len(w) for _, w in tracks)} samples")
+
+t0 = time.perf_counter()
+H, H_w, ipc = 0, 0, 0
+for sample, weights in tracks:
+    _H, _H_w = histogramdd(sample, bins, weights=weights)
+    ipc += len(pickle.dumps((_H, _H_w)))
+    H += _H
+    H_w += _H_w
+t1 = time.perf_counter()
+print(f"Dense : {t1 - t0:.2f} s, {ipc / N_int / 1e6:.2f} MB pickled per interval")
+
+t0 = time.perf_counter()
+total, ipc = None, 0
+for sample, weights in tracks:
+    partial = SparseHistogram.from_samples(sample, bins, weights=weights)
+    ipc += len(pickle.dumps(partial))
+    if total is None:
+        total = partial
+    else:
+        total += partial
+H_sparse, H_w_sparse = total.dense()
+t1 = time.perf_counter()
+print(f"Sparse: {t1 - t0:.2f} s, {ipc / N_int / 1e6:.3f} MB pickled per interval")
+print(f"Touched cells: {len(total.index)}/{H.size}")
+print(f"Identical: {np.array_equal(H, H_sparse) and np.array_equal(H_w, H_w_sparse)}")
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Import time of lib in a fresh interpreter, as paid by every pool worker
+# started with spawn or maxtasksperchild; best of `repeat`, less a bare start
+repeat = 10
+statements = [
+    "import lib",
+    "import lib.utils",
+    "import lib.load",
+    "from lib.utils import read_num_intervals",
+    "from lib.utils import read_data",
+    "from lib.stats import Histogram",
+    "from lib.numeric import curlometer",
+    "from lib.load import fgm",
+]
+# Largest import time of `import lib.utils` in seconds
+target = 0.05
+
+env = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parent.parent / "src"))
+
+
+def startup(statement):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    bare = startup("pass")
+    print(f"Interpreter start: {bare * 1e3:.1f} ms")
+    width = max(len(statement) for statement in statements)
+    results = {}
+    for statement in statements:
+        results[statement] = startup(statement) - bare
+        print(f"{statement.ljust(width)}  {results[statement] * 1e3:8.1f} ms")
+
+    assert results["import lib.utils"] < target, f"import lib.utils takes over {target * 1e3:.0f} ms"
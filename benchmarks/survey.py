@@ -0,0 +1,160 @@
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Sets the data directory before lib is imported
+from fixtures import lengths, link, make_fixture
+
+import numpy as np
+import astropy.units as u
+
+import lib
+from lib.stats.incremental import Reader
+from lib.utils import read_data, read_size, write_data
+
+# Timings of the survey stages on the synthetic fixture, per interval length
+repeat = 3
+# Tag of this run in the results, e.g. a branch or commit; previous runs are compared against
+label = os.environ.get("MMS_SURVEY_BENCHMARK_LABEL", "")
+
+scripts = Path(__file__).resolve().parent.parent / "scripts"
+figures = [
+    "Fig2_inner_tail",
+    "Fig3-4_compare_B14",
+    "Fig5_dipole_tilt",
+    "Fig6-7_XYZ_distribution",
+    "FigA1_lobe_stats",
+    "FigB1_omni",
+]
+
+
+def load_module(path):
+    # Named as by lib.pipeline.Script, with the script directory on sys.path
+    path = scripts / path
+    name = "_".join(path.with_suffix("").parts[-2:]).replace("-", "_")
+    if (module := sys.modules.get(name)) is None:
+        if (directory := str(path.parent)) not in sys.path:
+            sys.path.insert(0, directory)
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = sys.modules[name] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
+
+
+def timed(func, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times), float(np.median(times))
+
+
+def benchmarks(interval):
+    r"""(name, function) of each stage for one interval, in pipeline order"""
+    fgm = f"mms1/fgm/interval_{interval}"
+    fpi = f"mms1/ion-fpi-moms/interval_{interval}"
+    alignment = load_module("clm/alignment.py")
+    calculate = load_module("clm/calculate.py")
+    mask = load_module("clm/mask.py")
+    combine = load_module("combine_omni/calculate.py")
+    integrator = load_module("combine_omni/integrator.py")
+    renderer = load_module("plot_interval/renderer.py")
+
+    data = {key: read_data(f"{fgm}/{key}") for key in ["t", "B_gsm", "R_gsm"]}
+    E, f = read_data(f"{fpi}/f_omni_energy"), read_data(f"{fpi}/f_omni")
+    f[np.isnan(f)] = 0
+
+    def write():
+        # Scratch instrument, removed before the files are linked again
+        (lib.h5_dir / "mms1" / "benchmark").mkdir(parents=True, exist_ok=True)
+        write_data(1, interval, "benchmark", data)
+
+    yield "read_data fgm", lambda: [read_data(f"{fgm}/{key}") for key in data]
+    yield "read_data fpi f_omni", lambda: read_data(f"{fpi}/f_omni")
+    yield "write_data fgm", write
+    shutil.rmtree(lib.h5_dir / "mms1" / "benchmark")
+    yield "omni_integrate", lambda: integrator.omni_integrate(E, f)
+    yield "clm/alignment", lambda: alignment.alignment(interval)
+    yield "clm/calculate", lambda: calculate.calculate(interval)
+    yield "clm/mask", lambda: mask.helper(interval)
+    yield "combine_omni ion", lambda: combine.combine_omni(interval, species="ion", bg_remove=True, factor=1.5)
+    yield "combine_omni elc", lambda: combine.combine_omni(interval, species="elc")
+    link()
+
+    for figure in figures:
+        module = load_module(f"{figure}/gather_histograms.py")
+        if figure == "FigA1_lobe_stats":
+            # The whole interval as a single lobe event
+            for species in module.catalog:
+                module.catalog[species][interval] = [(0, slice(None))]
+        for loader in dict.fromkeys(spec.loader for spec in module.specs):
+            yield f"{figure} {loader.__name__}", lambda: loader(interval, Reader())
+            specs = [spec for spec in module.specs if spec.loader is loader]
+            loaded = loader(interval, Reader())
+            yield f"{figure} histogram", lambda: [spec.accumulate(loaded, {}, {}) for spec in specs]
+
+    fname = Path(tempfile.gettempdir()) / f"benchmark_interval_{interval}.png"
+    yield "plot_interval render", lambda: renderer.render(interval, fname)
+    fname.unlink(missing_ok=True)
+
+
+def table(rows, previous):
+    header = ["benchmark", "length", "samples", "best [s]", "median [s]", "previous [s]", "ratio"]
+    lines = [header]
+    for row in rows:
+        before = previous.get((row["benchmark"], row["interval"]))
+        lines.append(
+            [
+                row["benchmark"],
+                f"{row['length']:.1f} h",
+                str(row["samples"]),
+                f"{row['best']:.3f}",
+                f"{row['median']:.3f}",
+                "-" if before is None else f"{before:.3f}",
+                "-" if before is None else f"{row['best'] / before:.2f}",
+            ]
+        )
+    widths = np.max([[len(cell) for cell in line] for line in lines], axis=0)
+    for line in lines:
+        print("  ".join([line[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(line[1:], widths[1:])]))
+
+
+def read_previous(results_file):
+    # Best times of the last run recorded before this one
+    if not results_file.exists():
+        return {}
+    with open(results_file) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    if len(runs) == 0:
+        return {}
+    return {(row["benchmark"], row["interval"]): row["best"] for row in runs[-1]["rows"]}
+
+
+if __name__ == "__main__":
+    intervals = make_fixture()
+    # Next to the fixture, resolved once the data directory is set
+    results_file = lib.data_dir / "benchmarks.jsonl"
+    previous = read_previous(results_file)
+    print(f"Python {platform.python_version()}, numpy {np.__version__}, {os.cpu_count()} CPUs, best of {repeat}")
+
+    rows = []
+    for interval, length in zip(intervals, lengths.to_value(u.h)):
+        samples = read_size(f"mms1/fgm/interval_{interval}/t")
+        for name, func in benchmarks(interval):
+            best, median = timed(func)
+            rows.append(
+                dict(benchmark=name, interval=interval, length=length, samples=samples, best=best, median=median)
+            )
+            print(f"{name}, interval {interval}: {best:.3f} s", flush=True)
+
+    print()
+    table(rows, previous)
+    with open(results_file, "a") as f:
+        f.write(json.dumps(dict(label=label, time=time.time(), repeat=repeat, rows=rows)) + "\n")
@@ -3,6 +3,7 @@ import astropy.units as u
 from tvolib import mpl_utils as mu
 
 import lib
+from lib.numeric import magnitude, read_decimated
 from lib.utils import read_data
 
 # Event ID
@@ -13,6 +14,9 @@ t2 = np.datetime64("2017-07-26T07:29:30")
 t3 = np.datetime64("2017-07-26T07:40:00")
 icutoffs = np.array([28.3, 76.8]) * u.keV
 ecutoffs = np.array([27.5, 65.9]) * u.keV
+# Time bins of the 16 Hz panels, about their pixel columns at 600 dpi
+npix = 4000
+
 
 # Create figure
 mu.plt.rc("xtick", labelsize="small")
@@ -23,8 +27,9 @@ gs = fig.add_gridspec(8, 5, width_ratios=(1, 1, 0.025, 0.5, 1))
 fig.subplots_adjust(hspace=0.1, wspace=0.08, bottom=0.06, top=0.98, right=0.98)
 
 # Barycentric magnetic field
-t = read_data(f"/postprocess/interval_{interval}/barycenter/t").astype("datetime64[ns]")
-B_bc = read_data(f"/postprocess/interval_{interval}/barycenter/B_bc")
+t, B_bc = read_decimated(f"/postprocess/interval_{interval}/barycenter", "B_bc", npix, trange=trange)
+_, B_mag = read_decimated(f"/postprocess/interval_{interval}/barycenter", "B_bc", npix, trange=trange, func=magnitude)
+t = t.astype("datetime64[ns]")
 ax1 = fig.add_subplot(gs[0, 0:2])
 ax1.set_ylabel(f"{B_bc.unit:latex_inline}")
 ax1.set_ylim(-30, 30)
@@ -32,7 +37,7 @@ ax1.set_yticks(np.arange(-20, 21, 10))
 ax1.plot(t, B_bc[:, 0], "-b")
 ax1.plot(t, B_bc[:, 1], "-g")
 ax1.plot(t, B_bc[:, 2], "-r")
-ax1.plot(t, np.linalg.norm(B_bc, axis=1), "-k")
+ax1.plot(t, B_mag, "-k")
 kw = dict(x=1.02, transform=ax1.transAxes, fontsize="small")
 ax1.text(y=0.8, s="x", c="b", **kw)
 ax1.text(y=0.6, s="y", c="g", **kw)
@@ -40,7 +45,8 @@ ax1.text(y=0.4, s="z", c="r", **kw)
 ax1.text(y=0.2, s="mag", c="k", **kw)
 
 # Barycentric electric field
-E_bc = read_data(f"/postprocess/interval_{interval}/barycenter/E_bc")
+t, E_bc = read_decimated(f"/postprocess/interval_{interval}/barycenter", "E_bc", npix, trange=trange)
+t = t.astype("datetime64[ns]")
 ax2 = fig.add_subplot(gs[1, 0:2])
 ax2.set_ylabel(f"{E_bc.unit:latex_inline}")
 ax2.set_ylim(-150, 150)
@@ -13,11 +13,11 @@ tilt_Y = read_data(f"{where}/tilt_Y")
 H_doy_tilt = read_data(f"{where}/H_doy_tilt")
 H_Y_tilt = read_data(f"{where}/H_Y_tilt")
 
+tilt_avg = read_data(f"{where}/tilt_mean")
+tilt_std = read_data(f"{where}/tilt_std")
+
 P_doy_tilt = H_doy_tilt / H_doy_tilt.sum()
 P_Y_tilt = H_Y_tilt / H_Y_tilt.sum()
-tilt_avg = np.sum(tilt_Y * H_Y_tilt, axis=1) / np.sum(H_Y_tilt, axis=1)
-tilt_avg_tiled = np.tile(tilt_avg, (tilt_Y.shape[1], 1)).T
-tilt_std = np.sqrt(np.sum((tilt_Y - tilt_avg_tiled) ** 2 * H_Y_tilt, axis=1) / np.sum(H_Y_tilt, axis=1))
 
 dates = np.array([f"2017-{m}-01" for m in ["05", "06", "07", "08", "09", "10"]], dtype="datetime64[ns]")
 dates = (dates.astype("datetime64[D]") - dates.astype("datetime64[Y]")).astype("i8")
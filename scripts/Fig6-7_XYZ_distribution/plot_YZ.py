@@ -12,13 +12,9 @@ from lib.utils import read_data
 
 where = "/analysis/dipole_tilt"
 Y = read_data(f"{where}/Y").value
-tilt = read_data(f"{where}/tilt_Y").value
-H_Y_tilt = read_data(f"{where}/H_Y_tilt")
 y_tilt = Y[:, 0]
-# Calculate avg & std
-tilt_avg = np.sum(tilt * H_Y_tilt, axis=1) / np.sum(H_Y_tilt, axis=1)
-tilt_avg_tiled = np.tile(tilt_avg, (tilt.shape[1], 1)).T
-tilt_std = np.sqrt(np.sum((tilt - tilt_avg_tiled) ** 2 * H_Y_tilt, axis=1) / np.sum(H_Y_tilt, axis=1))
+tilt_avg = read_data(f"{where}/tilt_mean").value
+tilt_std = read_data(f"{where}/tilt_std").value
 # Fix nan
 y_tilt = y_tilt[~np.isnan(tilt_avg)]
 tilt_std = tilt_std[~np.isnan(tilt_avg)]
@@ -45,19 +41,16 @@ def ns_model(ymin=-20, ymax=20, Pobs=2, X=-20, chi=np.radians(20), tilt_model=f_
 
 where = "/analysis/XYZ_distribution"
 H = read_data(f"{where}/H")
-H[H < 100] = np.nan
-H_Bx = read_data(f"{where}/H_Bx")
-H_tilt = read_data(f"{where}/H_tilt")
-H_Bxy = read_data(f"{where}/H_Bxy")
-H_beta = read_data(f"{where}/H_beta")
+beta = read_data(f"{where}/beta_mean")
+Bxy = read_data(f"{where}/Bxy_mean")
+Bx = read_data(f"{where}/Bx_mean")
+tilt = read_data(f"{where}/tilt_mean")
 Xg = read_data(f"{where}/Xg")
 Yg = read_data(f"{where}/Yg")
 Zg = read_data(f"{where}/Zg")
 
-beta = H_beta / H
-Bxy = H_Bxy / H
-Bx = H_Bx / H
-tilt = H_tilt / H
+for var in [beta, Bxy, Bx, tilt]:
+    var[H < 100] = np.nan
 
 beta_YZ = np.nanmean(beta, axis=0)
 Bxy_YZ = np.nanmean(Bxy, axis=0)
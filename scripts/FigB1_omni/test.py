@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+# Synthetic survey of benchmarks/fixtures.py, kept apart from the survey data
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "benchmarks"))
+from fixtures import make_fixture
+
+import h5py as h5
+import numpy as np
+import astropy.units as u
+
+import lib
+from lib.numeric import SolarWind, merge_timeline, read_solar_wind
+from lib.utils import read_num_intervals
+
+make_fixture()
+keys = ["Pp", "By_gsm", "Bz_gsm"]
+rng = np.random.default_rng(0)
+
+
+def check(timeline):
+    # Lookups against direct sums over the records, at spacecraft times across
+    # the records, their gaps and beyond both ends
+    t = timeline["t"]
+    cadence = np.median(np.diff(t))
+    t_sc = np.sort(rng.uniform(t[0] - 30 * cadence, t[-1] + 30 * cadence, 2000))
+    sw = SolarWind(t, {key: timeline[key] for key in keys})
+
+    for lag in [0, 7.5, 45] * u.min:
+        shifted = t_sc - lag.to_value(u.ns)
+
+        # Record containing each lagged time
+        conditions = sw(t_sc, keys=keys, lag=lag)
+        for key in keys:
+            expected = np.full(len(t_sc), np.nan)
+            for k, s in enumerate(shifted):
+                if len(hit := np.flatnonzero((t <= s) & (s < t + cadence))) > 0:
+                    expected[k] = timeline[key][hit[-1]]
+            np.testing.assert_array_equal(conditions[key], expected, err_msg=f"{key}, lag {lag}")
+
+        # Mean of the finite records starting within the window before it
+        for window in [1, 10, 60] * u.min:
+            conditions = sw(t_sc, keys=keys, lag=lag, window=window)
+            for key in keys:
+                expected = np.full(len(t_sc), np.nan)
+                for k, s in enumerate(shifted):
+                    value = timeline[key][(s - window.to_value(u.ns) <= t) & (t < s)]
+                    if np.isfinite(value).any():
+                        expected[k] = np.nanmean(value)
+                np.testing.assert_allclose(conditions[key], expected, rtol=1e-9, err_msg=f"{key}, {lag}, {window}")
+
+
+# Timeline merged from the interval records, as by collect_omni.py
+segments = []
+with h5.File(lib.data_file, "r") as h5f:
+    for interval in range(read_num_intervals()):
+        group = h5f.get(f"/omni/interval_{interval}")
+        segments.append({} if group is None else {key: h5d[()] for key, h5d in group.items()})
+timeline, rows = merge_timeline(segments)
+t = timeline["t"]
+assert np.all(np.diff(t) > 0), "Timeline is not sorted without repeats"
+for interval, (start, stop) in enumerate(rows):
+    if stop > start:
+        np.testing.assert_array_equal(t[start:stop], segments[interval]["t"])
+
+stored = read_solar_wind()
+np.testing.assert_array_equal(stored.t, t)
+for key in keys:
+    np.testing.assert_array_equal(u.Quantity(stored.data[key]).value, timeline[key])
+check(timeline)
+
+# Overlapping segments with missing records, out of time order
+n = len(t) // 2
+values = {key: timeline[key].copy() for key in keys}
+values["Pp"][rng.uniform(size=len(t)) < 0.2] = np.nan
+first = {"t": t[: n + 100], **{key: value[: n + 100] for key, value in values.items()}}
+second = {"t": t[n - 50 :], **{key: value[n - 50 :] for key, value in values.items()}}
+merged, rows = merge_timeline([second, {}, first])
+np.testing.assert_array_equal(merged["t"], t)
+np.testing.assert_array_equal(rows, [[n + 100, len(t)], [0, 0], [0, n + 100]])
+check(merged)
+
+print(f"SolarWind lookups match direct sums over {len(t)} timeline records")
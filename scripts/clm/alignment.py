@@ -0,0 +1,38 @@
+import h5py as h5
+from pathos.pools import ProcessPool as Pool
+
+import lib
+from lib.numeric import alignment_table
+from lib.utils import interval_costs, lpt_order, read_data, read_num_intervals, staged
+
+
+@staged()
+def alignment(interval):
+    t_ref = read_data(f"mms1/fgm/interval_{interval}/t")
+
+    h5f = h5.File(lib.postprocess_dir / f"interval_{interval}.h5", "a")
+
+    if (where := f"/alignment") in h5f:
+        del h5f[where]
+
+    # Common grid is MMS1 FGM survey; tables are mostly monotonic, so they compress well
+    # Weights are f8 to gather as exactly as direct interpolation: uncompressed, the 8 tables take
+    # 96 bytes per MMS1 FGM sample (64 of them weights, against 32 with f4)
+    kw = dict(compression="gzip", shuffle=True, chunks=True)
+    h5f.create_dataset(f"{where}/t", data=t_ref, **kw)
+    for instrument in ["fgm", "edp"]:
+        for probe in range(1, 5):
+            t = read_data(f"mms{probe}/{instrument}/interval_{interval}/t")
+            index, weight = alignment_table(t, t_ref)
+            h5f.create_dataset(f"{where}/{instrument}/mms{probe}/index", data=index, **kw)
+            h5f.create_dataset(f"{where}/{instrument}/mms{probe}/weight", data=weight, **kw)
+
+    print(f"Calculated alignment tables for interval {interval}")
+
+
+if __name__ == "__main__":
+    intervals = range(read_num_intervals())
+    costs = interval_costs(intervals, where="mms1/fgm/interval_{}/t")
+    with Pool() as p:
+        for _ in p.uimap(alignment, lpt_order(intervals, costs)):
+            pass
@@ -1,87 +1,188 @@
+import os
+
 import h5py as h5
 import numpy as np
 import astropy.units as u
 import astropy.constants as c
 
 from pathos.pools import ProcessPool as Pool
-from tvolib.numeric import interpol, curlometer
+from tvolib.numeric import move_std
 
 import lib
-from lib.utils import read_data, read_num_intervals
-
-
-def calculate(interval):
-    t1 = read_data(f"mms1/fgm/interval_{interval}/t").astype("datetime64[ns]")
-    B1 = read_data(f"mms1/fgm/interval_{interval}/B_gsm")
-    R1 = read_data(f"mms1/fgm/interval_{interval}/R_gsm")
-    t2 = read_data(f"mms2/fgm/interval_{interval}/t").astype("datetime64[ns]")
-    B2 = read_data(f"mms2/fgm/interval_{interval}/B_gsm")
-    R2 = read_data(f"mms2/fgm/interval_{interval}/R_gsm")
-    t3 = read_data(f"mms3/fgm/interval_{interval}/t").astype("datetime64[ns]")
-    B3 = read_data(f"mms3/fgm/interval_{interval}/B_gsm")
-    R3 = read_data(f"mms3/fgm/interval_{interval}/R_gsm")
-    t4 = read_data(f"mms4/fgm/interval_{interval}/t").astype("datetime64[ns]")
-    B4 = read_data(f"mms4/fgm/interval_{interval}/B_gsm")
-    R4 = read_data(f"mms4/fgm/interval_{interval}/R_gsm")
-
-    B2 = interpol(B2, t2, t1)
-    R2 = interpol(R2, t2, t1)
-    B3 = interpol(B3, t3, t1)
-    R3 = interpol(R3, t3, t1)
-    B4 = interpol(B4, t4, t1)
-    R4 = interpol(R4, t4, t1)
-    B_bc = 0.25 * (B1 + B2 + B3 + B4)
-    R_bc = 0.25 * (R1 + R2 + R3 + R4)
-
-    _t1 = read_data(f"mms1/edp/interval_{interval}/t").astype("datetime64[ns]")
-    E1 = read_data(f"mms1/edp/interval_{interval}/E_gsm")
-    _t2 = read_data(f"mms2/edp/interval_{interval}/t").astype("datetime64[ns]")
-    E2 = read_data(f"mms2/edp/interval_{interval}/E_gsm")
-    _t3 = read_data(f"mms3/edp/interval_{interval}/t").astype("datetime64[ns]")
-    E3 = read_data(f"mms3/edp/interval_{interval}/E_gsm")
-    _t4 = read_data(f"mms4/edp/interval_{interval}/t").astype("datetime64[ns]")
-    E4 = read_data(f"mms4/edp/interval_{interval}/E_gsm")
-    E1 = interpol(E1, _t1, t1)
-    E2 = interpol(E2, _t2, t1)
-    E3 = interpol(E3, _t3, t1)
-    E4 = interpol(E4, _t4, t1)
-    E_bc = 0.25 * (E1 + E2 + E3 + E4)
-
-    clm_data = curlometer(B1, B2, B3, B4, R1, R2, R3, R4)
-    J_clm = (clm_data["curl_Q"] / c.si.mu0).to(u.Unit("nA m-2"))
-    J_err = (clm_data["div_Q"] / c.si.mu0).to(u.Unit("nA m-2"))
-
-    J_para = np.einsum("...i,...i", J_clm, B_bc) / np.linalg.norm(
-        B_bc, axis=-1
-    )
-    E_para = np.einsum("...i,...i", E_bc, B_bc) / np.linalg.norm(B_bc, axis=-1)
-    JdE = np.einsum("...i,...i", J_clm, E_bc).to(u.Unit("nW m-3"))
-    JdE_para = (J_para * E_para).to(u.Unit("nW m-3"))
-    JdE_perp = JdE - JdE_para
+from lib.numeric import align, box_interpol, curlometer, magnitude, write_pyramid
+from lib.utils import (
+    append_data,
+    interval_costs,
+    read_data,
+    read_num_intervals,
+    read_size,
+    sampling_period,
+    split_rows,
+    split_tasks,
+    stage,
+    staged,
+)
+
+# Window of the moving standard deviation for magnetic fluctuations
+Tsmooth = 5 * u.s
+# Number of MMS1 FGM samples processed at once (~2.3 h at 16 Hz)
+chunk_size = 2**17
+# Number of MMS1 FGM samples above which an interval is split across workers
+max_rows = 8 * chunk_size
+
+
+def read_aligned(h5f, interval, instrument, probe, var, start, stop):
+    # Gather `var` onto MMS1 FGM samples [start, stop) from the alignment tables
+    where = f"/alignment/{instrument}/mms{probe}"
+    index = h5f[f"{where}/index"][start:stop]
+    weight = h5f[f"{where}/weight"][start:stop]
+    offset = index.min()
+    rows = slice(offset, index.max() + 2)
+    y = read_data(f"mms{probe}/{instrument}/interval_{interval}/{var}", rows)
+    return align(y, index, weight, offset=offset)
+
+
+def calculate_chunk(h5f, interval, start, stop):
+    where = f"mms1/fgm/interval_{interval}"
+    t1 = read_data(f"{where}/t", slice(start, stop)).astype("datetime64[ns]")
+
+    B, R, E = [], [], []
+    with stage("align"):
+        for probe in range(1, 5):
+            B.append(read_aligned(h5f, interval, "fgm", probe, "B_gsm", start, stop))
+            R.append(read_aligned(h5f, interval, "fgm", probe, "R_gsm", start, stop))
+            E.append(read_aligned(h5f, interval, "edp", probe, "E_gsm", start, stop))
+
+    with stage("curlometer"):
+        clm_data = curlometer(np.stack(B, axis=1), np.stack(R, axis=1), np.stack(E, axis=1))
+    return t1, clm_data
+
+
+def calculate_rows(h5f, out, interval, first, last):
+    # Barycentric quantities of MMS1 FGM samples [first, last), appended to `out`
+    if "/alignment" not in h5f:
+        raise KeyError(f"No alignment tables for interval {interval}, run clm/alignment.py first")
+    t_fpi = read_data(f"mms1/ion-fpi-moms/interval_{interval}/t").astype("datetime64[ns]")
+    N = read_size(where := f"mms1/fgm/interval_{interval}/t")
+    dt = sampling_period(where)
+    Nsmooth = np.int64(Tsmooth / dt)
+    dt_fpi = sampling_period(f"mms1/ion-fpi-moms/interval_{interval}/t")
+    w = np.int64(max((dt_fpi / dt).decompose(), 1))
+    # Overlap covers the moving windows so chunk edges do not leak into results
+    overlap = 2 * (Nsmooth + w)
+
+    for start in range(first, last, chunk_size):
+        stop = min(start + chunk_size, N)
+        offset = max(start - overlap, 0)
+        t1, clm_data = calculate_chunk(h5f, interval, offset, min(stop + overlap, N))
+        core = slice(start - offset, stop - offset)
+        # FPI samples are split at the first FGM sample of each chunk
+        i_fpi = 0 if start == 0 else np.searchsorted(t_fpi, t1[core.start])
+        j_fpi = len(t_fpi) if stop == N else np.searchsorted(t_fpi, t1[core.stop])
+
+        where = "/barycenter"
+        append_data(out, f"{where}/t", t1[core].astype("f8"))
+        for name in [
+            "R_bc",
+            "B_bc",
+            "E_bc",
+            "J_clm",
+            "J_err",
+            "J_para",
+            "E_para",
+            "JdE_para",
+            "JdE_perp",
+            "elongation",
+            "planarity",
+        ]:
+            append_data(out, f"{where}/{name}", clm_data[name][core])
+
+        # Barycentric quantities box-averaged onto the FPI cadence
+        where = "/barycenter_fpi"
+        append_data(out, f"{where}/t", t_fpi[i_fpi:j_fpi].astype("f8"))
+        with stage("interpolate"):
+            B_bc = clm_data["B_bc"]
+            dB = np.stack([move_std(B_bc[:, i], (Nsmooth,)) for i in range(3)], axis=1)
+            B_mag = np.linalg.norm(B_bc, axis=-1)
+            averages = dict(
+                R=clm_data["R_bc"],
+                B=B_bc,
+                E=clm_data["E_bc"],
+                B_mag=B_mag,
+                B_xy=np.linalg.norm(B_bc[:, 0:2], axis=-1),
+                P_B=(B_mag**2 / 2 / c.si.mu0).to(u.nPa),
+                dB=dB,
+                dB_mag=np.linalg.norm(dB, axis=-1),
+            )
+            t_out = t_fpi[i_fpi:j_fpi]
+            averages = {name: box_interpol(var, t1, t_out, w) for name, var in averages.items()}
+        for name, var in averages.items():
+            append_data(out, f"{where}/{name}", var)
 
+
+def part_file(interval, part):
+    return lib.tmp_dir / f"clm_interval_{interval}_part_{part}.h5"
+
+
+@staged()
+def calculate(interval, part=0, parts=1):
+    # Parts of a split interval go to temporary files, merged by merge_parts
+    if parts > 1:
+        N = read_size(f"mms1/fgm/interval_{interval}/t")
+        with h5.File(lib.postprocess_dir / f"interval_{interval}.h5", "r") as h5f:
+            with h5.File(part_file(interval, part), "w") as out:
+                calculate_rows(h5f, out, interval, *split_rows(N, part, parts, step=chunk_size))
+        print(f"Calculated barycentric quantities for interval {interval} ({part + 1}/{parts})")
+        return
+
+    h5f = h5.File(lib.postprocess_dir / f"interval_{interval}.h5", "a")
+    # Alignment tables are written by alignment.py
+    for where in ["/barycenter", "/barycenter_fpi"]:
+        if where in h5f:
+            del h5f[where]
+
+    calculate_rows(h5f, h5f, interval, 0, read_size(f"mms1/fgm/interval_{interval}/t"))
+    finish(h5f, interval)
+
+
+@staged()
+def merge_parts(interval, parts):
     h5f = h5.File(lib.postprocess_dir / f"interval_{interval}.h5", "a")
+    for where in ["/barycenter", "/barycenter_fpi"]:
+        if where in h5f:
+            del h5f[where]
+
+    for part in range(parts):
+        with h5.File(part_file(interval, part), "r") as out:
+            for where in ["/barycenter", "/barycenter_fpi"]:
+                for name, h5d in out[where].items():
+                    data = h5d[()]
+                    if "unit" in h5d.attrs:
+                        data = data * u.Unit(h5d.attrs["unit"])
+                    append_data(h5f, f"{where}/{name}", data)
+        os.remove(part_file(interval, part))
 
-    if (where := f"/barycenter") in h5f:
-        del h5f[where]
-
-    h5f.create_dataset(f"{where}/t", data=t1.astype("f8"))
-    for name, var in dict(
-        R_bc=R_bc,
-        B_bc=B_bc,
-        E_bc=E_bc,
-        J_clm=J_clm,
-        J_err=J_err,
-        J_para=J_para,
-        E_para=E_para,
-    ).items():
-        h5d = h5f.create_dataset(f"{where}/{name}", data=var.value)
-        h5d.attrs["unit"] = str(var.unit)
+    finish(h5f, interval)
 
+
+def finish(h5f, interval):
+    h5f["/barycenter_fpi"].attrs["Tsmooth"] = Tsmooth.to_value(u.s)
+    # Level-of-detail pyramids read by lib.numeric.read_decimated
+    for name in ["B_bc", "E_bc"]:
+        write_pyramid(h5f, "/barycenter", name)
+    write_pyramid(h5f, "/barycenter", "B_bc", func=magnitude)
     print(f"Calculated barycentric quantities for interval {interval}")
 
 
 if __name__ == "__main__":
-    #calculate(0)
+    # Longest intervals first, those over max_rows split across workers
+    intervals = range(read_num_intervals())
+    costs = interval_costs(intervals, where="mms1/fgm/interval_{}/t")
+    tasks = split_tasks(intervals, costs, max_cost=max_rows)
     with Pool() as p:
-        for _ in p.uimap(calculate, range(read_num_intervals())):
+        for _ in p.uimap(lambda task: calculate(*task), tasks):
+            pass
+
+        split = {interval: parts for interval, _, parts in tasks if parts > 1}
+        for _ in p.uimap(lambda interval: merge_parts(interval, split[interval]), split):
             pass
@@ -0,0 +1,38 @@
+import astropy.units as u
+import numpy as np
+import h5py as h5
+from pathos.pools import ProcessPool as Pool
+
+import lib
+from lib.models import MagnetopauseMask
+from lib.utils import append_data, interval_costs, lpt_order, read_num_intervals, staged
+
+# Number of samples masked at once
+chunk_size = 2**17
+mask = MagnetopauseMask(pressure=20, bfield=0, tilt_angle=0, rotation_angle=np.radians(-5))
+
+
+@staged("mask")
+def helper(interval):
+    h5f = h5.File(lib.postprocess_dir / f"interval_{interval}.h5", "a")
+
+    if (where := f"/mask/{mask.key}") in h5f:
+        del h5f[where]
+
+    for group, var in [("barycenter", "R_bc"), ("barycenter_fpi", "R")]:
+        h5d = h5f[f"/{group}/{var}"]
+        unit = u.Unit(h5d.attrs["unit"])
+        for start in range(0, max(h5d.shape[0], 1), chunk_size):
+            R = h5d[start : start + chunk_size] * unit
+            append_data(h5f, f"{where}/{group}", mask.inside(R))
+
+    h5f[where].attrs.update(mask.params)
+    print(f"Calculated magnetopause mask for interval {interval}")
+
+
+if __name__ == "__main__":
+    intervals = range(read_num_intervals())
+    costs = interval_costs(intervals, where="mms1/fgm/interval_{}/t")
+    with Pool() as p:
+        for _ in p.uimap(helper, lpt_order(intervals, costs)):
+            pass
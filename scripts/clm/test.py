@@ -1,126 +1,93 @@
+import sys
+from pathlib import Path
+
+# Synthetic survey of benchmarks/fixtures.py, kept apart from the survey data
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "benchmarks"))
+from fixtures import make_fixture
+
 import astropy.constants as c
 import astropy.units as u
 import numpy as np
-import pyspedas as sp
-from pyspedas.mms.fgm.mms_curl import mms_curl
-from pytplot import get
-from tvolib import mpl_utils as mu
-from tvolib.numeric import curlometer, interpol
+from tvolib.numeric import curlometer as curlometer_tvo
+from tvolib.numeric import interpol
 
+from alignment import alignment
+from calculate import calculate
+from lib.numeric import curlometer
 from lib.utils import read_data
 
-i = 418
-# trange = np.array(["2017-07-26T07:28:00", "2017-07-26T07:29:30"], dtype="datetime64[ns]")
-trange = np.array(
-    ["2017-07-26T07:25:00", "2017-07-26T07:35:00"], dtype="datetime64[ns]"
+# Shortest interval of the fixture
+i = make_fixture()[0]
+alignment(i)
+calculate(i)
+
+where = f"/postprocess/interval_{i}/barycenter"
+t1 = read_data(f"{where}/t").astype("datetime64[ns]")
+stored = {
+    name: read_data(f"{where}/{name}")
+    for name in ["B_bc", "R_bc", "J_clm", "J_err", "J_para", "elongation", "planarity"]
+}
+
+# Reference from the probe data interpolated onto MMS1 FGM by tvolib instead of
+# the alignment tables, and the tvolib curlometer
+B, R = [], []
+for probe in range(1, 5):
+    t = read_data(f"mms{probe}/fgm/interval_{i}/t").astype("datetime64[ns]")
+    B.append(interpol(read_data(f"mms{probe}/fgm/interval_{i}/B_gsm"), t, t1).to(u.nT))
+    R.append(interpol(read_data(f"mms{probe}/fgm/interval_{i}/R_gsm"), t, t1).to(u.km))
+clm_tvo = curlometer_tvo(*B, *R)
+J = (clm_tvo["curl_Q"] / c.si.mu0).to(u.Unit("nA m-2"))
+J_err = (clm_tvo["div_Q"] / c.si.mu0).to(u.Unit("nA m-2"))
+B_bc = sum(B) / 4
+J_para = np.einsum("ni,ni->n", J, B_bc / np.linalg.norm(B_bc, axis=-1, keepdims=True))
+
+# Semiaxes of the volumetric tensor from the singular values of the positions
+# about the barycenter, in descending order
+R = np.stack(R, axis=1).value
+valid = np.isfinite(R).all(axis=(1, 2))
+semiaxes = np.full((len(R), 3), np.nan)
+semiaxes[valid] = np.linalg.svd(R[valid] - R[valid].mean(axis=1, keepdims=True), compute_uv=False) / 2
+a, b, c_ = semiaxes.T
+
+# Edges of the interval outside of some probe's samples are NaN in both
+assert np.isfinite(stored["J_clm"]).any(), "No current density in the fixture interval"
+tol = dict(rtol=1e-9, atol=1e-9, equal_nan=True)
+np.testing.assert_allclose(stored["B_bc"].to_value(u.nT), B_bc.value, **tol)
+np.testing.assert_allclose(stored["R_bc"].to_value(u.km), R.mean(axis=1), **tol)
+# Currents are the small differences of fields across the tetrahedron, hence
+# the absolute tolerance in nA/m2
+tol = dict(rtol=1e-6, atol=1e-3, equal_nan=True)
+np.testing.assert_allclose(stored["J_clm"].to_value("nA m-2"), J.value, **tol)
+np.testing.assert_allclose(stored["J_err"].to_value("nA m-2"), J_err.value, **tol)
+np.testing.assert_allclose(stored["J_para"].to_value("nA m-2"), J_para.value, **tol)
+tol = dict(rtol=1e-6, atol=1e-9, equal_nan=True)
+np.testing.assert_allclose(stored["elongation"], 1 - b / a, **tol)
+np.testing.assert_allclose(stored["planarity"], 1 - c_ / b, **tol)
+
+# Linear fields are exact for the curlometer: at the fixture positions, with
+# known curl and divergence
+rng = np.random.default_rng(0)
+R = R[valid][:: max(len(R) // 1000, 1)] * u.km
+# Gradient G_ij = dB_j / dx_i in nT/km
+G = rng.normal(0, 1e-3, (3, 3))
+B = (np.einsum("ij,nai->naj", G, R.value) + [10, 0, 2]) * u.nT
+clm_data = curlometer(B, R)
+curl = np.array([G[1, 2] - G[2, 1], G[2, 0] - G[0, 2], G[0, 1] - G[1, 0]]) * u.nT / u.km
+np.testing.assert_allclose(
+    clm_data["J_clm"].to_value("nA m-2"), np.tile((curl / c.si.mu0).to_value("nA m-2"), (len(R), 1)), rtol=1e-6
 )
-
-t1 = read_data(f"mms1/fgm/interval_{i}/t").astype("datetime64[ns]")
-B1 = read_data(f"mms1/fgm/interval_{i}/B_gsm")
-R1 = read_data(f"mms1/fgm/interval_{i}/R_gsm")
-t2 = read_data(f"mms2/fgm/interval_{i}/t").astype("datetime64[ns]")
-B2 = read_data(f"mms2/fgm/interval_{i}/B_gsm")
-R2 = read_data(f"mms2/fgm/interval_{i}/R_gsm")
-t3 = read_data(f"mms3/fgm/interval_{i}/t").astype("datetime64[ns]")
-B3 = read_data(f"mms3/fgm/interval_{i}/B_gsm")
-R3 = read_data(f"mms3/fgm/interval_{i}/R_gsm")
-t4 = read_data(f"mms4/fgm/interval_{i}/t").astype("datetime64[ns]")
-B4 = read_data(f"mms4/fgm/interval_{i}/B_gsm")
-R4 = read_data(f"mms4/fgm/interval_{i}/R_gsm")
-
-B2 = interpol(B2, t2, t1)
-R2 = interpol(R2, t2, t1)
-B3 = interpol(B3, t3, t1)
-R3 = interpol(R3, t3, t1)
-B4 = interpol(B4, t4, t1)
-R4 = interpol(R4, t4, t1)
-B_bc = 0.25 * (B1 + B2 + B3 + B4)
-
-_t1 = read_data(f"mms1/edp/interval_{i}/t").astype("datetime64[ns]")
-E1 = read_data(f"mms1/edp/interval_{i}/E_gsm")
-_t2 = read_data(f"mms2/edp/interval_{i}/t").astype("datetime64[ns]")
-E2 = read_data(f"mms2/edp/interval_{i}/E_gsm")
-_t3 = read_data(f"mms3/edp/interval_{i}/t").astype("datetime64[ns]")
-E3 = read_data(f"mms3/edp/interval_{i}/E_gsm")
-_t4 = read_data(f"mms4/edp/interval_{i}/t").astype("datetime64[ns]")
-E4 = read_data(f"mms4/edp/interval_{i}/E_gsm")
-E1 = interpol(E1, _t1, t1)
-E2 = interpol(E2, _t2, t1)
-E3 = interpol(E3, _t3, t1)
-E4 = interpol(E4, _t4, t1)
-E_bc = 0.25 * (E1 + E2 + E3 + E4)
-
-clm_data = curlometer(B1, B2, B3, B4, R1, R2, R3, R4)
-J_clm = (clm_data["curl_Q"] / c.si.mu0).to(u.Unit("nA m-2"))
-
-J_para = np.einsum("...i,...i", J_clm, B_bc) / np.linalg.norm(B_bc, axis=-1)
-E_para = np.einsum("...i,...i", E_bc, B_bc) / np.linalg.norm(B_bc, axis=-1)
-JdE = np.einsum("...i,...i", J_clm, E_bc).to(u.Unit("nW m-3"))
-JdE_para = (J_para * E_para).to(u.Unit("nW m-3"))
-JdE_perp = JdE - JdE_para
-
-
-sp.mms.fgm(
-    trange=trange.astype(str),
-    probe=[1, 2, 3, 4],
-    data_rate="srvy",
-    time_clip=True,
-    get_fgm_ephemeris=True,
+np.testing.assert_allclose(
+    clm_data["J_err"].to_value("nA m-2"),
+    np.full(len(R), (np.trace(G) * u.nT / u.km / c.si.mu0).to_value("nA m-2")),
+    rtol=1e-6,
 )
 
-fields = [f"mms{i}_fgm_b_gsm_srvy_l2" for i in range(1, 5)]
-positions = [f"mms{i}_fgm_r_gsm_srvy_l2" for i in range(1, 5)]
-mms_curl(fields=fields, positions=positions)
-
-t_ref, J_ref = get("curlB", dt=True, units=True)
-J_ref = (J_ref * u.Unit("nT/km") / c.si.mu0).to(u.Unit("nA m-2"))
-
-fig, axes = mu.plt.subplots(3, 1, figsize=(12, 8))
-
-axes[0].plot(t1, E_bc[:, 0], "-b")
-axes[0].plot(t1, E_bc[:, 1], "-g")
-axes[0].plot(t1, E_bc[:, 2], "-r")
-
-axes[1].plot(t1, J_clm[:, 0], "-b")
-axes[1].plot(t1, J_clm[:, 1], "-g")
-axes[1].plot(t1, J_clm[:, 2], "-r")
-
-axes[2].plot(t1, JdE_perp, "-b")
-axes[2].plot(t1, JdE_para, "-r")
-
-for i, ax in enumerate(axes):
-    # ax.set_xlim(*trange)
-    ax.set_xlim(
-        *np.array(
-            ["2017-07-26T07:28:00", "2017-07-26T07:29:30"],
-            dtype="datetime64[ns]",
-        )
-    )
-    mu.format_datetime_axis(ax)
-
-fig.tight_layout(h_pad=0.05)
-fig.savefig("test_event.png")
-
-fig, axes = mu.plt.subplots(3, 1, figsize=(12, 8))
-
-axes[0].plot(t1, J_clm[:, 0], "-k", lw=2)
-axes[0].plot(t_ref, J_ref[:, 0], "--r", lw=2)
-
-axes[1].plot(t1, J_clm[:, 1], "-k", lw=2)
-axes[1].plot(t_ref, J_ref[:, 1], "--r", lw=2)
-
-axes[2].plot(t1, J_clm[:, 2], "-k", lw=2)
-axes[2].plot(t_ref, J_ref[:, 2], "--r", lw=2)
-
-for i, ax in enumerate(axes):
-    # ax.set_xlim(*trange)
-    ax.set_xlim(
-        *np.array(
-            ["2017-07-26T07:28:00", "2017-07-26T07:29:30"],
-            dtype="datetime64[ns]",
-        )
-    )
-    mu.format_datetime_axis(ax)
+# Regular tetrahedron of the fixture stretched along rotated axes to semiaxes
+# 3, 2 and 1: elongation 1 - 2/3 and planarity 1 - 1/2
+Q, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+vertices = np.array([[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]) * [3, 2, 1] @ Q.T
+clm_data = curlometer(np.ones((1, 4, 3)) * u.nT, vertices[np.newaxis] * 10 * u.km)
+np.testing.assert_allclose(clm_data["elongation"], [1 / 3], rtol=1e-12)
+np.testing.assert_allclose(clm_data["planarity"], [1 / 2], rtol=1e-12)
 
-fig.tight_layout(h_pad=0.05)
-fig.savefig("test_compare.png")
+print(f"Curlometer of interval {i} matches tvolib over {np.isfinite(stored['J_err']).sum()} samples")
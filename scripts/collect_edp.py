@@ -6,10 +6,14 @@ from pathos.pools import ProcessPool as Pool
 
 import lib
 from lib.load import edp
-from lib.utils import read_num_intervals, write_data
+from lib.utils import interval_costs, lpt_order, read_num_intervals, write_data
 
 
 def helper(probe, interval):
+    where = lib.h5_dir / f"mms{probe}" / instrument
+    where.mkdir(parents=True, exist_ok=True)
+    # Only the file being collected starts over, so an interrupted run keeps the others
+    h5.File(where / f"interval_{interval}.h5", "w").close()
     data = edp(probe, interval, drate="fast")
     write_data(probe, interval, instrument, data)
     print(f"MMS{probe}: Saved EDP data for interval {interval}", flush=True)
@@ -18,12 +22,10 @@ def helper(probe, interval):
 probes = range(1, 5)
 intervals = range(read_num_intervals())
 instrument = "edp"
-for probe in probes:
-    where = lib.h5_dir / f"mms{probe}" / instrument
-    where.mkdir(parents=True, exist_ok=True)
-    for intv in intervals:
-        h5.File(where / f"interval_{intv}.h5", "w")
 
-# with Pool(8) as pool:
-#    for _ in pool.uimap(lambda args: helper(*args), product(probes, intervals)):
-#        pass
+if __name__ == "__main__":
+    with Pool(8) as pool:
+        # Longest intervals first, so that the pool does not end on a few of them
+        tasks = lpt_order(product(probes, intervals), interval_costs(intervals), key=lambda args: args[1])
+        for _ in pool.uimap(lambda args: helper(*args), tasks):
+            pass
@@ -6,10 +6,16 @@ from pathos.pools import ProcessPool as Pool
 
 import lib
 from lib.load import fpi_moms
-from lib.utils import read_num_intervals, write_data
+from lib.utils import interval_costs, lpt_order, read_num_intervals, write_data
 
 
 def helper(probe, interval):
+    for species in ["ion", "elc"]:
+        where = lib.h5_dir / f"mms{probe}" / f"{species}-fpi-moms"
+        where.mkdir(parents=True, exist_ok=True)
+        # Only the files being collected start over, so an interrupted run keeps the others
+        h5.File(where / f"interval_{interval}.h5", "w").close()
+
     print(
         f"MMS{probe}: Saving FPI moment data for interval {interval}",
         flush=True,
@@ -27,13 +33,10 @@ def helper(probe, interval):
 
 probes = range(1, 5)
 intervals = range(read_num_intervals())
-for probe in probes:
-    for species in ["ion", "elc"]:
-        where = lib.h5_dir / f"mms{probe}" / f"{species}-fpi-moms"
-        where.mkdir(parents=True, exist_ok=True)
-        for intv in intervals:
-            h5.File(where / f"interval_{intv}.h5", "w")
 
-# with Pool(8) as pool:
-#    for _ in pool.uimap(lambda args: helper(*args), product(probes, intervals)):
-#        pass
+if __name__ == "__main__":
+    with Pool(8) as pool:
+        # Longest intervals first, so that the pool does not end on a few of them
+        tasks = lpt_order(product(probes, intervals), interval_costs(intervals), key=lambda args: args[1])
+        for _ in pool.uimap(lambda args: helper(*args), tasks):
+            pass
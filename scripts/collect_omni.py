@@ -6,14 +6,16 @@ from pathos.pools import ProcessPool as Pool
 
 import lib
 from lib.load import omni
-from lib.utils import read_num_intervals, write_data
+from lib.numeric import merge_timeline
+from lib.utils import interval_costs, lpt_order, read_num_intervals, write_data
 
 
 def helper(interval):
     data = omni(interval)
 
-    fname = data_dir / f"interval_{interval}.h5"
-    h5f = h5.File(fname, "a")
+    data_dir.mkdir(parents=True, exist_ok=True)
+    # Only the file being collected starts over, so an interrupted run keeps the others
+    h5f = h5.File(data_dir / f"interval_{interval}.h5", "w")
     for key, value in data.items():
         if (where := f"/{key}") in h5f:
             del h5f[where]
@@ -27,13 +29,33 @@ def helper(interval):
     print(f"Saved OMNI data for interval {interval}", flush=True)
 
 
+def write_timeline():
+    # Survey-wide timeline, stored once without the records repeated where
+    # intervals overlap, linked as /omni/timeline by link_files.py
+    segments, units = [], {}
+    for intv in intervals:
+        with h5.File(data_dir / f"interval_{intv}.h5", "r") as h5f:
+            segments.append({key: h5d[()] for key, h5d in h5f.items()})
+            units.update({key: h5d.attrs["unit"] for key, h5d in h5f.items() if "unit" in h5d.attrs})
+
+    timeline, rows = merge_timeline(segments)
+    with h5.File(data_dir / "timeline.h5", "w") as h5f:
+        for key, value in timeline.items():
+            h5d = h5f.create_dataset(key, data=value)
+            if key in units:
+                h5d.attrs["unit"] = units[key]
+        h5f.create_dataset("rows", data=rows)
+
+    print(f"Saved OMNI timeline with {rows[:, 1].max(initial=0)} records", flush=True)
+
+
 intervals = range(read_num_intervals())
 instrument = "omni"
 data_dir = lib.h5_dir / instrument
-data_dir.mkdir(parents=True, exist_ok=True)
-for intv in intervals:
-    h5.File(data_dir / f"interval_{intv}.h5", "w")
 
-with Pool(8) as pool:
-    for _ in pool.uimap(helper, intervals):
-        pass
+if __name__ == "__main__":
+    with Pool(8) as pool:
+        for _ in pool.uimap(helper, lpt_order(intervals, interval_costs(intervals))):
+            pass
+
+    write_timeline()
@@ -7,9 +7,17 @@ from integrator import omni_integrate
 from pathos.pools import ProcessPool as Pool
 
 import lib
-from lib.utils import read_data, read_num_intervals
+from lib.numeric import write_pyramid
+from lib.utils import (
+    interval_costs,
+    lpt_order,
+    read_data,
+    read_num_intervals,
+    staged,
+)
 
 
+@staged()
 def combine_omni(
     interval,
     species="ion",
@@ -109,6 +117,12 @@ def combine_omni(
         h5d = h5f.create_dataset(f"{where}/{name}", data=var.value)
         h5d.attrs["unit"] = str(var.unit)
 
+    # Level-of-detail pyramids read by lib.numeric.read_decimated
+    for name in ["N", "P_scalar", "P_scalar_nt"]:
+        write_pyramid(h5f, where, name)
+    for name in ["f_omni", "f_omni_energy"]:
+        write_pyramid(h5f, where, name, log=True)
+
     print(
         f"Calculated combined {species} omni distribution and scalar moments for interval {interval}"
     )
@@ -116,6 +130,11 @@ def combine_omni(
 
 if __name__ == "__main__":
     intervals = range(read_num_intervals())
+    # Longest intervals first, so that the pool does not end on a few of them
+    intervals = lpt_order(
+        intervals,
+        interval_costs(intervals, where="mms1/ion-fpi-moms/interval_{}/t"),
+    )
     with Pool() as p:
         for _ in p.uimap(
             lambda i: combine_omni(
@@ -0,0 +1,26 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+from lib.stats import run_histograms
+
+# Survey-wide histograms of each figure, accumulated in a single sweep
+figures = [
+    "Fig2_inner_tail",
+    "Fig3-4_compare_B14",
+    "Fig5_dipole_tilt",
+    "Fig6-7_XYZ_distribution",
+    "FigB1_omni",
+]
+
+
+def load_specs(figure):
+    path = Path(__file__).resolve().parent / figure / "gather_histograms.py"
+    spec = importlib.util.spec_from_file_location(figure.replace("-", "_"), path)
+    module = sys.modules[spec.name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.specs
+
+
+if __name__ == "__main__":
+    run_histograms([spec for figure in figures for spec in load_specs(figure)])
@@ -6,26 +6,33 @@ import numpy as np
 import lib
 from lib.utils import read_num_intervals
 
-h5f = h5.File(lib.data_file, "w")
-for root, dirs, files in os.walk(dir := lib.h5_dir):
-    if len(dirs) > 0:
-        continue
 
-    path = os.path.relpath(root, dir)
-    for f in files:
-        h5f[f"{path}/{os.path.splitext(f)[0]}"] = h5.ExternalLink(
-            f"{root}/{f}", "/"
-        )
+def link():
+    # Rebuilt from scratch so that removed files drop out
+    h5f = h5.File(lib.data_file, "w")
+    for root, dirs, files in os.walk(dir := lib.h5_dir):
+        if len(dirs) > 0:
+            continue
 
+        path = os.path.relpath(root, dir)
+        for f in files:
+            h5f[f"{path}/{os.path.splitext(f)[0]}"] = h5.ExternalLink(
+                f"{root}/{f}", "/"
+            )
 
-for root, dirs, files in os.walk(dir := lib.postprocess_dir):
-    if len(dirs) > 0:
-        continue
+    for root, dirs, files in os.walk(dir := lib.postprocess_dir):
+        if len(dirs) > 0:
+            continue
 
-    path = os.path.relpath(root, dir)
-    for f in files:
-        h5f[f"/postprocess/{path}/{os.path.splitext(f)[0]}"] = h5.ExternalLink(
-            f"{root}/{f}", "/"
-        )
+        path = os.path.relpath(root, dir)
+        for f in files:
+            h5f[f"/postprocess/{path}/{os.path.splitext(f)[0]}"] = h5.ExternalLink(
+                f"{root}/{f}", "/"
+            )
 
-h5f["analysis"] = h5.ExternalLink(lib.data_dir / "analysis.h5", "/")
+    h5f["analysis"] = h5.ExternalLink(lib.data_dir / "analysis.h5", "/")
+    h5f.close()
+
+
+if __name__ == "__main__":
+    link()
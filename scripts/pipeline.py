@@ -0,0 +1,185 @@
+from pathlib import Path
+
+import lib
+from lib.pipeline import Script, Task, run_pipeline
+from lib.utils import interval_costs, read_num_intervals
+
+# Worker processes shared by the tasks of all stages
+processes = 8
+
+scripts = Path(__file__).resolve().parent
+# Collected files per (script, instruments, probes)
+collects = [
+    ("collect_fgm.py", ["fgm"], range(1, 5)),
+    ("collect_edp.py", ["edp"], range(1, 5)),
+    ("collect_fpi_moms.py", ["ion-fpi-moms", "elc-fpi-moms"], range(1, 5)),
+    ("collect_feeps.py", ["ion-feeps", "elc-feeps"], range(1, 5)),
+    ("collect_mec.py", ["mec"], range(1, 2)),
+]
+figures = [
+    "Fig2_inner_tail",
+    "Fig3-4_compare_B14",
+    "Fig5_dipole_tilt",
+    "Fig6-7_XYZ_distribution",
+    "FigB1_omni",
+]
+plots = [
+    "Fig1_fpi_feeps_combination_example/plot.py",
+    "Fig2_inner_tail/plot.py",
+    "Fig3-4_compare_B14/plot.py",
+    "Fig5_dipole_tilt/plot.py",
+    "Fig6-7_XYZ_distribution/plot_XZ.py",
+    "Fig6-7_XYZ_distribution/plot_YZ.py",
+    "FigA1_lobe_stats/plot.py",
+    "FigB1_omni/plot.py",
+]
+
+
+def h5_file(probe, instrument, interval):
+    return lib.h5_dir / f"mms{probe}" / instrument / f"interval_{interval}.h5"
+
+
+def tasks():
+    intervals = range(read_num_intervals())
+    # Interval durations order the queue until the journal has run times
+    costs = interval_costs(intervals)
+    tasks = []
+
+    # Stage 1: one task per file downloaded; these are the bulk of the work
+    collected = {}
+    for script, instruments, probes in collects:
+        for probe in probes:
+            for interval in intervals:
+                name = f"{Path(script).stem}/mms{probe}/interval_{interval}"
+                outputs = [h5_file(probe, instrument, interval) for instrument in instruments]
+                func = Script(scripts / script, "helper")
+                tasks.append(Task(name, func, (probe, interval), outputs=outputs, cost=costs[interval]))
+                collected[script, probe, interval] = name
+
+    omni = Script(scripts / "collect_omni.py", "helper")
+    for interval in intervals:
+        outputs = [lib.h5_dir / "omni" / f"interval_{interval}.h5"]
+        tasks.append(
+            Task(f"collect_omni/interval_{interval}", omni, (interval,), outputs=outputs, cost=costs[interval])
+        )
+    tasks.append(
+        Task(
+            "collect_omni/timeline",
+            Script(scripts / "collect_omni.py", "write_timeline"),
+            outputs=[lib.h5_dir / "omni" / "timeline.h5"],
+            deps=[f"collect_omni/interval_{interval}" for interval in intervals],
+        )
+    )
+
+    # Links are rebuilt once every file of the stage before is written
+    link = Script(scripts / "link_files.py", "link")
+    dirs = [lib.h5_dir / f"mms{probe}" / inst for _, insts, probes in collects for probe in probes for inst in insts]
+    tasks.append(
+        Task(
+            "link_files/h5",
+            link,
+            inputs=dirs + [lib.h5_dir / "omni"],
+            outputs=[lib.data_file],
+            after=[task.name for task in tasks],
+            exclusive=True,
+        )
+    )
+
+    # Stage 2: barycentric quantities, then the magnetopause mask and the combined
+    # distributions; all of them write the same postprocess file, hence the ordering
+    alignment = Script(scripts / "clm" / "alignment.py", "alignment")
+    calculate = Script(scripts / "clm" / "calculate.py", "calculate")
+    mask = Script(scripts / "clm" / "mask.py", "helper")
+    combine_omni = Script(scripts / "combine_omni" / "calculate.py", "combine_omni")
+    combine_code = [scripts / "combine_omni" / f for f in ["calculate.py", "background.py", "integrator.py"]]
+    postprocessed = []
+    for interval in intervals:
+        fields = [collected[f"collect_{inst}.py", probe, interval] for inst in ["fgm", "edp"] for probe in range(1, 5)]
+        moms = [collected["collect_fpi_moms.py", 1, interval], collected["collect_feeps.py", 1, interval]]
+        stage = [
+            Task(f"clm/alignment/interval_{interval}", alignment, (interval,), deps=fields, after=["link_files/h5"]),
+            Task(
+                f"clm/calculate/interval_{interval}",
+                calculate,
+                (interval,),
+                deps=[f"clm/alignment/interval_{interval}", moms[0]],
+            ),
+            Task(f"clm/mask/interval_{interval}", mask, (interval,), deps=[f"clm/calculate/interval_{interval}"]),
+            Task(
+                f"combine_omni/ion/interval_{interval}",
+                combine_omni,
+                (interval,),
+                dict(species="ion", bg_remove=True, factor=1.5),
+                deps=moms,
+                after=[f"clm/mask/interval_{interval}"],
+                code=combine_code,
+            ),
+            Task(
+                f"combine_omni/elc/interval_{interval}",
+                combine_omni,
+                (interval,),
+                dict(species="elc"),
+                deps=moms,
+                after=[f"combine_omni/ion/interval_{interval}"],
+                code=combine_code,
+            ),
+        ]
+        for task in stage:
+            task.outputs = [str(lib.postprocess_dir / f"interval_{interval}.h5")]
+            task.cost = costs[interval]
+        tasks.extend(stage)
+        postprocessed.extend(task.name for task in stage)
+
+    tasks.append(
+        Task(
+            "link_files/postprocess",
+            link,
+            inputs=[lib.postprocess_dir],
+            outputs=[lib.data_file],
+            deps=["link_files/h5"],
+            after=postprocessed,
+            exclusive=True,
+        )
+    )
+
+    # Stage 3: survey histograms, each run with its own pool over all collected and postprocessed data
+    stage = [task.name for task in tasks]
+    tasks.append(
+        Task(
+            "gather_histograms",
+            Script(scripts / "gather_histograms.py"),
+            code=[scripts / "gather_histograms.py"] + [scripts / figure / "gather_histograms.py" for figure in figures],
+            outputs=[lib.analysis_file],
+            deps=stage,
+            exclusive=True,
+        )
+    )
+    tasks.append(
+        Task(
+            "FigA1_lobe_stats/gather_histograms",
+            Script(scripts / "FigA1_lobe_stats" / "gather_histograms.py"),
+            outputs=[lib.analysis_file],
+            deps=stage,
+            after=["gather_histograms"],
+            exclusive=True,
+        )
+    )
+
+    # Stage 4: figures
+    analysis = ["gather_histograms", "FigA1_lobe_stats/gather_histograms"]
+    for plot in plots:
+        tasks.append(Task(plot, Script(scripts / plot), deps=stage + analysis))
+    tasks.append(
+        Task(
+            "plot_interval/plot.py",
+            Script(scripts / "plot_interval" / "plot.py"),
+            code=[scripts / "plot_interval" / f for f in ["plot.py", "renderer.py"]],
+            deps=stage,
+            exclusive=True,
+        )
+    )
+    return tasks
+
+
+if __name__ == "__main__":
+    run_pipeline(tasks(), processes=processes)
@@ -0,0 +1,153 @@
+import gc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import astropy.units as u
+from tvolib import mpl_utils as mu
+
+from lib.numeric import magnitude, read_decimated
+from lib.utils import rss, staged
+
+# Resident memory above which a worker drops its figure and builds a new one
+max_rss = 2 * u.GB
+
+icutoffs = np.array([28.3, 76.8]) * u.keV
+ecutoffs = np.array([27.5, 65.9]) * u.keV
+# Time bins per panel, about the pixel columns of the saved figure
+npix = 3000
+# Placeholder giving the empty lines a datetime x-axis
+t0 = np.array(["2017-05-01"], dtype="datetime64[ns]")
+
+
+class Renderer:
+    # Survey plot with figure, axes, lines and colorbars created once; each
+    # interval only replaces the line data and the spectrogram meshes
+
+    def __init__(self):
+        self.fig, self.axes = mu.plt.subplots(8, 1, figsize=(12, 11), sharex=True)
+        self.lines = {}
+        self.meshes = {}
+        self.colorbars = {}
+        axes = self.axes
+
+        # Barycentric magnetic and electric fields, MMS1 ion velocity
+        for i, name, colors in [
+            (0, "B_bc", ["-b", "-g", "-r", "-k"]),
+            (1, "E_bc", ["-b", "-g", "-r"]),
+            (2, "Vi", ["-b", "-g", "-r"]),
+        ]:
+            mu.add_colorbar(ax := axes[i]).remove()
+            self.lines[name] = [ax.plot(t0, [np.nan], c)[0] for c in colors]
+
+        # MMS1 energy spectra
+        self.norm = mu.mplc.LogNorm(1e2, 1e8)
+        for i, species, cutoffs in [(3, "ion", icutoffs), (4, "elc", ecutoffs)]:
+            cax = mu.add_colorbar(ax := axes[i])
+            ax.set_yscale("log")
+            ax.set_ylim(1e-1, 1e3)
+            ax.set_yticks(np.power(10.0, np.arange(-1, 3, 1)))
+            sm = mu.plt.cm.ScalarMappable(norm=self.norm, cmap="jet")
+            self.colorbars[species] = self.fig.colorbar(sm, cax=cax)
+            ax.axhline(cutoffs[0].value, c="magenta", ls="--", lw=2)
+            ax.axhline(cutoffs[1].value, c="magenta", ls="--", lw=2)
+            ax.set_facecolor("silver")
+
+        # MMS1 densities, pressures and nonthermal pressures
+        for i, name in [(5, "N"), (6, "P_scalar"), (7, "P_scalar_nt")]:
+            mu.add_colorbar(ax := axes[i]).remove()
+            self.lines[name] = [
+                ax.plot(t0, [np.nan], "-k", lw=2)[0],
+                ax.plot(t0, [np.nan], "--r", lw=2)[0],
+            ]
+            kw = dict(x=1.02, transform=ax.transAxes, fontsize="small")
+            ax.text(y=0.8, s="Ion", c="r", **kw)
+            ax.text(y=0.2, s="Elc", c="k", **kw)
+
+        for ax in axes:
+            mu.format_datetime_axis(ax)
+
+        self.title = self.fig.suptitle("")
+
+    def set_lines(self, name, t, ys):
+        for line, y in zip(self.lines[name], ys):
+            line.set_data(np.asarray(t).astype("datetime64[ns]"), np.asarray(y))
+
+    def set_mesh(self, i, species, t, Wg, f):
+        if (mesh := self.meshes.pop(species, None)) is not None:
+            mesh.remove()
+        tg = np.tile(t.astype("datetime64[ns]"), (Wg.shape[1], 1)).T
+        self.meshes[species] = self.axes[i].pcolormesh(
+            tg, Wg.value, f.value, norm=self.norm, cmap="jet", rasterized=True
+        )
+        self.axes[i].set_ylabel(f"{Wg.unit:latex_inline}")
+        self.colorbars[species].set_label(f"{f.unit:latex_inline}", fontsize="x-small")
+
+    def render(self, interval, fname):
+        where = f"/postprocess/interval_{interval}"
+        axes = self.axes
+
+        # Barycentric fields
+        t, B_bc = read_decimated(f"{where}/barycenter", "B_bc", npix)
+        _, B_mag = read_decimated(f"{where}/barycenter", "B_bc", npix, func=magnitude)
+        self.set_lines("B_bc", t, [*B_bc.T.value, B_mag.value])
+        t, E_bc = read_decimated(f"{where}/barycenter", "E_bc", npix)
+        self.set_lines("E_bc", t, E_bc.T.value)
+        axes[0].set_ylabel(f"{B_bc.unit:latex_inline}")
+        axes[1].set_ylabel(f"{E_bc.unit:latex_inline}")
+
+        # MMS1 ion velocity
+        t, Vi = read_decimated(f"/mms1/ion-fpi-moms/interval_{interval}", "V_gsm", npix)
+        Vi = Vi.to(u.Unit("1000 km/s"))
+        self.set_lines("Vi", t, Vi.T.value)
+        axes[2].set_ylabel(f"{Vi.unit:latex_inline}")
+
+        # MMS1 moments
+        for i, name in [(5, "N"), (6, "P_scalar"), (7, "P_scalar_nt")]:
+            t_ion, y_ion = read_decimated(f"{where}/ion", name, npix)
+            t_elc, y_elc = read_decimated(f"{where}/elc", name, npix)
+            self.set_lines(name, t_elc, [y_elc.value])
+            self.lines[name][1].set_data(t_ion.astype("datetime64[ns]"), y_ion.value)
+            axes[i].set_ylabel(f"{y_ion.unit:latex_inline}")
+
+        # Limits of the previous interval, meshes included, are dropped here
+        for ax in axes:
+            ax.relim()
+
+        # MMS1 energy spectra, averaged onto at most npix columns
+        for i, species in [(3, "ion"), (4, "elc")]:
+            t, Wg = read_decimated(f"{where}/{species}", "f_omni_energy", npix, kind="average")
+            _, f = read_decimated(f"{where}/{species}", "f_omni", npix, kind="average")
+            self.set_mesh(i, species, t, Wg, f)
+
+        for ax in axes:
+            ax.autoscale_view()
+        self.title.set_text(f"Interval {interval}")
+        # Tick labels and units change with the interval, and so does the layout
+        self.fig.align_ylabels(axes)
+        self.fig.tight_layout(h_pad=0.05)
+        self.fig.savefig(fname)
+
+    def close(self):
+        mu.plt.close(self.fig)
+
+
+# One renderer per process, built on its first interval
+renderer = None
+
+
+@staged()
+def render(interval, fname):
+    global renderer
+    if renderer is None:
+        mu.setup(cache=True)
+        renderer = Renderer()
+
+    renderer.render(interval, fname)
+    # Resident memory is not known, nor checked, where /proc is unavailable
+    if (resident := rss()) is not None and resident * u.byte > max_rss:
+        renderer.close()
+        renderer = None
+        gc.collect()
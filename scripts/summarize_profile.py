@@ -0,0 +1,41 @@
+import numpy as np
+
+from lib.utils import read_report, summarize
+
+# Records written with MMS_SURVEY_PROFILE set; defaults to data/profile.jsonl
+report = None
+# Slowest calls listed per top-level stage
+top = 5
+
+
+def table(rows, keys):
+    header = [*keys, "count", "wall [s]", "cpu [s]", "cpu/wall", "peak RSS [GB]", "read [GB]", "written [GB]"]
+    lines = [header]
+    for row in rows:
+        lines.append(
+            [
+                *[str(row[key]) for key in keys],
+                str(row["count"]),
+                f"{row['wall']:.1f}",
+                f"{row['cpu']:.1f}",
+                f"{row['cpu'] / row['wall']:.2f}" if row["wall"] > 0 else "-",
+                f"{row['peak_rss'] / 2**30:.2f}",
+                f"{row['read'] / 2**30:.2f}",
+                f"{row['written'] / 2**30:.2f}",
+            ]
+        )
+    widths = np.max([[len(cell) for cell in line] for line in lines], axis=0)
+    for line in lines:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+
+if __name__ == "__main__":
+    # Time per stage; nested stages are included in their parents
+    table(summarize(report), ["stage"])
+
+    entries = read_report(report)
+    for name in dict.fromkeys(entry["stage"] for entry in entries if "/" not in entry["stage"]):
+        calls = sorted((entry for entry in entries if entry["stage"] == name), key=lambda entry: -entry["wall"])
+        labels = [key for key in ["probe", "interval", "species", "part"] if key in calls[0]]
+        print(f"\nSlowest {name}")
+        table([dict(entry, count=1) for entry in calls[:top]], labels)
@@ -1,14 +1,98 @@
+import importlib
+import os
+import sys
+import types
 from pathlib import Path
 
 work_dir = Path(__file__).resolve().parent / ".." / ".."
-plot_dir = work_dir / "plots"
 resource_dir = work_dir / "resources"
-data_dir = work_dir / "data"
-tmp_dir = data_dir / "tmp"
-h5_dir = data_dir / "h5"
-postprocess_dir = data_dir / "postprocess"
-for dir in [plot_dir, data_dir, postprocess_dir, tmp_dir, h5_dir]:
-    dir.mkdir(parents=True, exist_ok=True)
-
-data_file = data_dir / "data.h5"
-analysis_file = data_dir / "analysis.h5"
+# Data may be kept elsewhere, e.g. on a scratch disk or for benchmarks
+directories = dict(
+    plot_dir=work_dir / "plots",
+    data_dir=Path(os.environ.get("MMS_SURVEY_DATA_DIR", work_dir / "data")),
+)
+directories.update(
+    tmp_dir=directories["data_dir"] / "tmp",
+    h5_dir=directories["data_dir"] / "h5",
+    postprocess_dir=directories["data_dir"] / "postprocess",
+)
+files = dict(
+    data_file=directories["data_dir"] / "data.h5",
+    analysis_file=directories["data_dir"] / "analysis.h5",
+    # Histogram partials of lib.stats and journal of lib.pipeline
+    partials_file=directories["data_dir"] / "partials.h5",
+    journal_file=directories["data_dir"] / "pipeline.jsonl",
+)
+submodules = [
+    "load",
+    "models",
+    "numeric",
+    "pipeline",
+    "stats",
+    "survey",
+    "utils",
+]
+
+
+def lazy(package, exports):
+    r"""
+    PEP 562 `__getattr__` and `__dir__` of a package importing each of its
+    names from the submodule defining it on first use, so that importing
+    the package does not import their dependencies.
+
+    Parameters
+    ----------
+    package: str
+        `__name__` of the package
+    exports: dict
+        Name to submodule, e.g. dict(read_data="reader")
+    """
+    module = sys.modules[package]
+
+    def load(submodule):
+        # Every name of a submodule at once, over the submodule itself when
+        # a name is also that of its submodule, e.g. lib.numeric.curlometer
+        for name, where in exports.items():
+            if where == submodule.__name__.rpartition(".")[2]:
+                vars(module)[name] = getattr(submodule, name)
+
+    class Package(types.ModuleType):
+        def __setattr__(self, name, value):
+            # The import system binds each imported submodule on the package
+            if isinstance(value, types.ModuleType) and name in exports:
+                return load(value)
+            super().__setattr__(name, value)
+
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}"
+            )
+        load(importlib.import_module(f".{exports[name]}", package))
+        return vars(module)[name]
+
+    def __dir__():
+        return sorted({*vars(module), *exports})
+
+    module.__class__ = Package
+    return __getattr__, __dir__
+
+
+def __getattr__(name):
+    # Directories are made on first use rather than on import
+    if name in directories:
+        value = directories[name]
+        value.mkdir(parents=True, exist_ok=True)
+    elif name in files:
+        value = files[name]
+        __getattr__("data_dir")
+    elif name in submodules:
+        return importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *directories, *files, *submodules})
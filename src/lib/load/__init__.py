@@ -1,6 +1,13 @@
-from .edp import edp
-from .feeps import feeps
-from .fgm import fgm
-from .mec import mec
-from .omni import omni
-from .fpi_moms import fpi_moms
+from lib import lazy
+
+# Each loader imports pyspedas and pytplot when it is called
+exports = dict(
+    edp="edp",
+    feeps="feeps",
+    fgm="fgm",
+    mec="mec",
+    omni="omni",
+    fpi_moms="fpi_moms",
+)
+__all__ = list(exports)
+__getattr__, __dir__ = lazy(__name__, exports)
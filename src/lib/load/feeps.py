@@ -4,13 +4,9 @@ import tempfile
 
 import astropy.units as u
 import numpy as np
-from pyspedas.mms import mms_config, mms_load_feeps
-from pyspedas.mms.feeps.mms_feeps_active_eyes import mms_feeps_active_eyes
-from pytplot import del_data, get
-from tvolib.numeric import move_avg, sampling_period
 
 import lib
-from lib.utils import read_trange
+from lib.utils import read_trange, stage, staged
 
 energy_channels = dict(
     ion=np.array(
@@ -82,7 +78,13 @@ geometric_factor = dict(
 )
 
 
+@staged()
 def feeps(probe, interval, drate="srvy", species="elc"):
+    from pyspedas.mms import mms_config, mms_load_feeps
+    from pyspedas.mms.feeps.mms_feeps_active_eyes import mms_feeps_active_eyes
+    from pytplot import del_data, get
+    from tvolib.numeric import move_avg, sampling_period
+
     trange = read_trange(interval, dtype=str)
     dtype = "ion" if species == "ion" else "electron"
     pfx = f"mms{probe}_epd_feeps_{drate}_l2_{dtype}"
@@ -95,23 +97,24 @@ def feeps(probe, interval, drate="srvy", species="elc"):
     ]
 
     # Download FEEPS files
-    with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
-        tempfile.tempdir = tmp_dir
-        # mms_config.CONFIG["local_data_dir"] = tmp_dir
-        kw = dict(
-            trange=trange,
-            probe=probe,
-            data_rate=drate,
-            datatype=dtype,
-            time_clip=True,
-        )
-        for _ in range(3):
-            try:
-                mms_load_feeps(latest_version=True, **kw)
-                break
-            except OSError:
-                mms_load_feeps(major_version=True, **kw)
-                break
+    with stage("download"):
+        with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
+            tempfile.tempdir = tmp_dir
+            # mms_config.CONFIG["local_data_dir"] = tmp_dir
+            kw = dict(
+                trange=trange,
+                probe=probe,
+                data_rate=drate,
+                datatype=dtype,
+                time_clip=True,
+            )
+            for _ in range(3):
+                try:
+                    mms_load_feeps(latest_version=True, **kw)
+                    break
+                except OSError:
+                    mms_load_feeps(major_version=True, **kw)
+                    break
 
     # Preallocate
     t, _, _ = get(
@@ -125,22 +128,27 @@ def feeps(probe, interval, drate="srvy", species="elc"):
     eflux_err[:] = np.nan
 
     # Accumulate data from each instrument
-    for i, (head, eye) in enumerate(insts):
-        _, nflux, _energy = get(f"{pfx}_{head}_intensity_sensorid_{eye}_{sfx}")
-        _, err, _ = get(f"{pfx}_{head}_percent_error_sensorid_{eye}")
-        _energy = _energy[1:]
-        # Convert number flux to energy flux
-        eflux[i] = (
-            nflux[:, 1:]
-            * u.Unit("cm-2 s-1 sr-1 keV-1")
-            * energy[np.newaxis, np.newaxis, :]
-        )
-        # Kludge for outdated cdf files
-        eflux_err[i] = 0 if err is None else eflux[i] * err[:, 1:15] / 100
-        # Mask out energy correction
-        idx = np.where(np.abs(energy.value - _energy) > (0.1 * energy.value))
-        eflux[i, :, idx] = np.nan
-        eflux_err[i, :, idx] = np.nan
+    with stage("accumulate"):
+        for i, (head, eye) in enumerate(insts):
+            _, nflux, _energy = get(
+                f"{pfx}_{head}_intensity_sensorid_{eye}_{sfx}"
+            )
+            _, err, _ = get(f"{pfx}_{head}_percent_error_sensorid_{eye}")
+            _energy = _energy[1:]
+            # Convert number flux to energy flux
+            eflux[i] = (
+                nflux[:, 1:]
+                * u.Unit("cm-2 s-1 sr-1 keV-1")
+                * energy[np.newaxis, np.newaxis, :]
+            )
+            # Kludge for outdated cdf files
+            eflux_err[i] = 0 if err is None else eflux[i] * err[:, 1:15] / 100
+            # Mask out energy correction
+            idx = np.where(
+                np.abs(energy.value - _energy) > (0.1 * energy.value)
+            )
+            eflux[i, :, idx] = np.nan
+            eflux_err[i, :, idx] = np.nan
 
     # Collapse to omni-directional distribution with condition on error threshold
     cnd = (0 <= (eflux_err / eflux)) & ((eflux_err / eflux) <= 1)
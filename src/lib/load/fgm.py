@@ -5,38 +5,41 @@ __all__ = ["fgm"]
 import tempfile
 
 import numpy as np
-import tvolib as tv
-from pyspedas.mms import mms_config, mms_load_fgm
-from pytplot import del_data, get
 
 import lib
-from lib.utils import read_trange
+from lib.utils import read_trange, stage, staged
 
 
+@staged()
 def fgm(probe, interval, drate="srvy"):
+    import tvolib as tv
+    from pyspedas.mms import mms_config, mms_load_fgm
+    from pytplot import del_data, get
+
     trange = read_trange(interval, dtype=str)
     pfx = f"mms{probe}_fgm"
     sfx = f"{drate}_l2"
 
     # Download FGM files
-    with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
-        tempfile.tempdir = tmp_dir
-        mms_config.CONFIG["local_data_dir"] = tmp_dir
-        kw = dict(
-            trange=trange,
-            probe=probe,
-            data_rate=drate,
-            time_clip=True,
-            get_fgm_ephemeris=True,
-            varnames=[f"{pfx}_{var}_{sfx}" for var in ["b_gsm", "r_gsm"]],
-        )
-        for _ in range(3):
-            try:
-                mms_load_fgm(latest_version=True, **kw)
-                break
-            except OSError:
-                mms_load_fgm(major_version=True, **kw)
-                break
+    with stage("download"):
+        with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
+            tempfile.tempdir = tmp_dir
+            mms_config.CONFIG["local_data_dir"] = tmp_dir
+            kw = dict(
+                trange=trange,
+                probe=probe,
+                data_rate=drate,
+                time_clip=True,
+                get_fgm_ephemeris=True,
+                varnames=[f"{pfx}_{var}_{sfx}" for var in ["b_gsm", "r_gsm"]],
+            )
+            for _ in range(3):
+                try:
+                    mms_load_fgm(latest_version=True, **kw)
+                    break
+                except OSError:
+                    mms_load_fgm(major_version=True, **kw)
+                    break
 
     # Unpack data
     t, B_gsm = get(f"{pfx}_b_gsm_{sfx}", dt=True, units=True)
@@ -5,17 +5,18 @@ import tempfile
 import astropy.constants as c
 import astropy.units as u
 import numpy as np
-import tvolib as tv
-from pyspedas import tinterpol
-from pyspedas.mms import mms_config, mms_load_fpi, mms_load_mec
-from pyspedas.mms.cotrans.mms_qcotrans import mms_qcotrans
-from pytplot import del_data, get, store_data
 
 import lib
-from lib.utils import read_trange
+from lib.utils import read_trange, stage, staged
 
 
+@staged()
 def fpi_moms(probe, interval, drate="fast", species="elc", E_cutoff=60 * u.eV):
+    from pyspedas import tinterpol
+    from pyspedas.mms import mms_config, mms_load_fpi, mms_load_mec
+    from pyspedas.mms.cotrans.mms_qcotrans import mms_qcotrans
+    from pytplot import del_data, get, store_data
+
     trange = read_trange(interval, dtype=str)
     dtype = "dis" if species == "ion" else "des"
     charge = c.si.e if species == "ion" else -c.si.e
@@ -24,38 +25,40 @@ def fpi_moms(probe, interval, drate="fast", species="elc", E_cutoff=60 * u.eV):
     sfx = f"{drate}"
 
     # Download FPI moment files
-    with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
-        tempfile.tempdir = tmp_dir
-        mms_config.CONFIG["local_data_dir"] = tmp_dir
-        mec_coords = ["gse", "gsm", "dbcs"]
-        fpi_kw = dict(
-            trange=trange,
-            probe=probe,
-            data_rate=drate,
-            datatype=[f"{dtype}-moms", f"{dtype}-partmoms"],
-            notplot=True,  # pyspedas not loading partmoms, awaiting bugfix
-            time_clip=True,
-            get_support_data=True,
-            center_measurement=True,
-        )
-        mec_kw = dict(
-            trange=trange,
-            probe=probe,
-            data_rate="srvy" if drate == "fast" else drate,
-            time_clip=True,
-            varnames=[
-                f"mms{probe}_mec_quat_eci_to_{coord}" for coord in mec_coords
-            ],
-        )
-        for _ in range(3):
-            try:
-                data = mms_load_fpi(latest_version=True, **fpi_kw)
-                mms_load_mec(latest_version=True, **mec_kw)
-                break
-            except OSError:
-                data = mms_load_fpi(major_version=True, **fpi_kw)
-                mms_load_mec(major_version=True, **mec_kw)
-                break
+    with stage("download"):
+        with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
+            tempfile.tempdir = tmp_dir
+            mms_config.CONFIG["local_data_dir"] = tmp_dir
+            mec_coords = ["gse", "gsm", "dbcs"]
+            fpi_kw = dict(
+                trange=trange,
+                probe=probe,
+                data_rate=drate,
+                datatype=[f"{dtype}-moms", f"{dtype}-partmoms"],
+                notplot=True,  # pyspedas not loading partmoms, awaiting bugfix
+                time_clip=True,
+                get_support_data=True,
+                center_measurement=True,
+            )
+            mec_kw = dict(
+                trange=trange,
+                probe=probe,
+                data_rate="srvy" if drate == "fast" else drate,
+                time_clip=True,
+                varnames=[
+                    f"mms{probe}_mec_quat_eci_to_{coord}"
+                    for coord in mec_coords
+                ],
+            )
+            for _ in range(3):
+                try:
+                    data = mms_load_fpi(latest_version=True, **fpi_kw)
+                    mms_load_mec(latest_version=True, **mec_kw)
+                    break
+                except OSError:
+                    data = mms_load_fpi(major_version=True, **fpi_kw)
+                    mms_load_mec(major_version=True, **mec_kw)
+                    break
 
     vars = [
         "energyspectr_omni",
@@ -109,29 +112,30 @@ def fpi_moms(probe, interval, drate="fast", species="elc", E_cutoff=60 * u.eV):
     ).to(u.Unit("keV cm-3"))
 
     # Rotate V_gse to GSM
-    store_data(
-        f"{pfx}_bulkv_gse_{sfx}",
-        data=dict(x=t.astype("datetime64[s]").astype("f8"), y=V_gse.value),
-    )
-    store_data(
-        f"{pfx}_bhat_dbcs_{sfx}",
-        data=dict(x=t.astype("datetime64[s]").astype("f8"), y=b_dbcs),
-    )
-    for coord in mec_coords:
-        tinterpol(
-            f"mms{probe}_mec_quat_eci_to_{coord}",
+    with stage("rotate"):
+        store_data(
             f"{pfx}_bulkv_gse_{sfx}",
-            suffix="",
+            data=dict(x=t.astype("datetime64[s]").astype("f8"), y=V_gse.value),
         )
+        store_data(
+            f"{pfx}_bhat_dbcs_{sfx}",
+            data=dict(x=t.astype("datetime64[s]").astype("f8"), y=b_dbcs),
+        )
+        for coord in mec_coords:
+            tinterpol(
+                f"mms{probe}_mec_quat_eci_to_{coord}",
+                f"{pfx}_bulkv_gse_{sfx}",
+                suffix="",
+            )
 
-    mms_qcotrans(
-        f"{pfx}_bulkv_gse_{sfx}", f"{pfx}_bulkv_gsm_{sfx}", "gse", "gsm"
-    )
-    mms_qcotrans(
-        f"{pfx}_bhat_dbcs_{sfx}", f"{pfx}_bhat_gse_{sfx}", "dbcs", "gse"
-    )
-    V_gsm = get(f"{pfx}_bulkv_gsm_{sfx}").y * u.Unit("km/s")
-    b_gse = get(f"{pfx}_bhat_gse_{sfx}").y
+        mms_qcotrans(
+            f"{pfx}_bulkv_gse_{sfx}", f"{pfx}_bulkv_gsm_{sfx}", "gse", "gsm"
+        )
+        mms_qcotrans(
+            f"{pfx}_bhat_dbcs_{sfx}", f"{pfx}_bhat_gse_{sfx}", "dbcs", "gse"
+        )
+        V_gsm = get(f"{pfx}_bulkv_gsm_{sfx}").y * u.Unit("km/s")
+        b_gse = get(f"{pfx}_bhat_gse_{sfx}").y
 
     # Account for background in ion moments
     if species == "ion":
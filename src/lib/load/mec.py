@@ -5,36 +5,40 @@ __all__ = ["mec"]
 import tempfile
 
 import numpy as np
-import tvolib as tv
-from pyspedas.mms import mms_config, mms_load_mec
-from pytplot import del_data, get
 
 import lib
-from lib.utils import read_trange
+from lib.utils import read_trange, stage, staged
 
 
+@staged()
 def mec(probe, interval, drate="srvy"):
+    from pyspedas.mms import mms_config, mms_load_mec
+    from pytplot import del_data, get
+
     trange = read_trange(interval, dtype=str)
     pfx = f"mms{probe}_mec"
 
     # Download MEC files
-    with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
-        tempfile.tempdir = tmp_dir
-        mms_config.CONFIG["local_data_dir"] = tmp_dir
-        kw = dict(
-            trange=trange,
-            probe=probe,
-            data_rate=drate,
-            time_clip=True,
-            varnames=[f"{pfx}_{var}" for var in ["dipole_tilt", "kp", "dst"]],
-        )
-        for _ in range(3):
-            try:
-                mms_load_mec(latest_version=True, **kw)
-                break
-            except OSError:
-                mms_load_mec(major_version=True, **kw)
-                break
+    with stage("download"):
+        with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
+            tempfile.tempdir = tmp_dir
+            mms_config.CONFIG["local_data_dir"] = tmp_dir
+            kw = dict(
+                trange=trange,
+                probe=probe,
+                data_rate=drate,
+                time_clip=True,
+                varnames=[
+                    f"{pfx}_{var}" for var in ["dipole_tilt", "kp", "dst"]
+                ],
+            )
+            for _ in range(3):
+                try:
+                    mms_load_mec(latest_version=True, **kw)
+                    break
+                except OSError:
+                    mms_load_mec(major_version=True, **kw)
+                    break
 
     # Unpack data
     t, dipole_tilt = get(f"{pfx}_dipole_tilt", dt=True, units=True)
@@ -5,23 +5,25 @@ __all__ = ["omni"]
 import tempfile
 
 import numpy as np
-import tvolib as tv
-from pyspedas.omni import data as omni_data
-from pyspedas.omni.config import CONFIG
-from pytplot import del_data, get
 
 import lib
-from lib.utils import read_trange
+from lib.utils import read_trange, stage, staged
 
 
+@staged()
 def omni(interval):
+    from pyspedas.omni import data as omni_data
+    from pyspedas.omni.config import CONFIG
+    from pytplot import del_data, get
+
     trange = read_trange(interval, dtype=str)
 
     # Download MEC files
-    with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
-        tempfile.tempdir = tmp_dir
-        CONFIG["local_data_dir"] = tmp_dir
-        omni_data(trange=trange, level="hro2", time_clip=True)
+    with stage("download"):
+        with tempfile.TemporaryDirectory(dir=lib.tmp_dir) as tmp_dir:
+            tempfile.tempdir = tmp_dir
+            CONFIG["local_data_dir"] = tmp_dir
+            omni_data(trange=trange, level="hro2", time_clip=True)
 
     # Unpack data
     t, Bx_gse = get("BX_GSE", dt=True, units=True)
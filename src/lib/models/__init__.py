@@ -0,0 +1,8 @@
+from lib import lazy
+
+# Submodule of each name, imported on first use
+exports = dict(
+    MagnetopauseMask="magnetopause",
+)
+__all__ = list(exports)
+__getattr__, __dir__ = lazy(__name__, exports)
@@ -0,0 +1,127 @@
+r"""Tabulated Lin+ (2010) magnetopause boundary for fast XY-plane masks"""
+
+__all__ = ["MagnetopauseMask"]
+
+import time
+
+import astropy.units as u
+import h5py as h5
+import numpy as np
+
+import lib
+
+
+class MagnetopauseMask:
+    r"""
+    Boundary radius of the Lin10 magnetopause model in the GSM XY-plane,
+    tabulated once on a uniform angle grid and cached in
+    `lib.data_dir / "magnetopause.h5"` under a key built from the model
+    parameters. Membership is then a periodic `np.interp` lookup.
+    """
+
+    # Seconds between attempts to open the cache while another process
+    # writes to it, and the number of attempts
+    wait = 0.1
+    attempts = 600
+
+    def __init__(
+        self,
+        pressure=20,
+        bfield=0,
+        tilt_angle=0,
+        rotation_angle=np.radians(-5),
+        N=2**16,
+    ):
+        r"""
+
+        Parameters
+        ----------
+        pressure: nPa
+            Total (dynamic and magnetic) solar wind pressure
+        bfield: nT
+            z coordinate of the interplanetary magnetic field
+        tilt_angle: rad
+            Dipole tilt angle
+        rotation_angle: rad
+            Rotation of the boundary in the XY-plane
+        N: int
+            Number of grid points in [-pi, pi)
+        """
+        self.params = dict(
+            pressure=pressure,
+            bfield=bfield,
+            tilt_angle=tilt_angle,
+            rotation_angle=rotation_angle,
+        )
+        self.key = "_".join(f"{k}={v:.6g}" for k, v in self.params.items())
+        self.theta, self.radius = self.load_table(N)
+
+    def load_table(self, N):
+        where = f"/{self.key}/N={N}"
+        cache_file = lib.data_dir / "magnetopause.h5"
+        # Read-only when tabulated, as pool workers construct masks at once
+        if (table := self.open(cache_file, "r", where)) is not None:
+            return table
+        theta, radius = self.tabulate(N)
+        self.open(cache_file, "a", where, theta=theta, radius=radius)
+        return theta, radius
+
+    def open(self, cache_file, mode, where, **table):
+        r"""
+        Table at `where` in the cache, or None if it is not there, writing
+        `table` first if given. Opening is retried while another process
+        holds the HDF5 file lock.
+        """
+        for attempt in range(self.attempts):
+            if mode == "r" and not cache_file.exists():
+                return None
+            try:
+                with h5.File(cache_file, mode) as h5f:
+                    if where not in h5f:
+                        if len(table) == 0:
+                            return None
+                        for key, value in table.items():
+                            h5f.create_dataset(f"{where}/{key}", data=value)
+                    return h5f[f"{where}/theta"][:], h5f[f"{where}/radius"][:]
+            except BlockingIOError:
+                if attempt + 1 == self.attempts:
+                    raise
+                time.sleep(self.wait)
+
+    def tabulate(self, N):
+        from tvolib.models.magnetopause_model import Lin10MagnetopauseModel
+
+        p = self.params
+        model = Lin10MagnetopauseModel(
+            pressure=p["pressure"],
+            bfield=p["bfield"],
+            tilt_angle=p["tilt_angle"],
+        )
+        # Same boundary points as model.shape_F, but interpolated linearly:
+        # its spline rings by many orders of magnitude at the wrap angle
+        X, Y = model.shape_N(
+            which="XY", N=1000000, rotation_angle=p["rotation_angle"]
+        )
+        T, idx = np.unique(np.arctan2(Y, X), return_index=True)
+        theta = np.linspace(-np.pi, np.pi, N, endpoint=False)
+        radius = np.interp(theta, T, np.hypot(X, Y)[idx], period=2 * np.pi)
+        return theta, radius
+
+    def boundary(self, T_XY):
+        r"""Boundary radius (R_E) at XY-plane angles `T_XY` (rad)."""
+        return np.interp(T_XY, self.theta, self.radius, period=2 * np.pi)
+
+    def inside(self, R):
+        r"""
+        Parameters
+        ----------
+        R: Quantity, shape (N, 2 or 3)
+            GSM positions
+
+        Return
+        ------
+        mask: bool array, shape (N,)
+            True inside the magnetopause (NaN positions are outside)
+        """
+        X, Y = R[:, 0].to_value(u.R_earth), R[:, 1].to_value(u.R_earth)
+        return np.hypot(X, Y) <= self.boundary(np.arctan2(Y, X))
@@ -0,0 +1,28 @@
+from lib import lazy
+
+# Submodule of each name, imported on first use
+exports = dict(
+    align="alignment",
+    alignment_table="alignment",
+    curlometer="curlometer",
+    reciprocal_vectors="curlometer",
+    tetrahedron_quality="curlometer",
+    bin_average="decimation",
+    minmax_envelope="decimation",
+    read_decimated="decimation",
+    time_bins="decimation",
+    box_interpol="interpolation",
+    Pyramid="pyramid",
+    lod_rows="pyramid",
+    magnitude="pyramid",
+    pyramid_levels="pyramid",
+    read_lod="pyramid",
+    write_pyramid="pyramid",
+    SolarWind="solar_wind",
+    merge_timeline="solar_wind",
+    read_solar_wind="solar_wind",
+    day_of_year="time_features",
+    epoch_seconds="time_features",
+)
+__all__ = list(exports)
+__getattr__, __dir__ = lazy(__name__, exports)
@@ -0,0 +1,61 @@
+r"""Index/weight tables for aligning probe time series to a common grid"""
+
+__all__ = ["alignment_table", "align"]
+
+import numpy as np
+
+
+def alignment_table(t, t_ref):
+    r"""
+    Tabulate the linear interpolation of samples at `t` onto `t_ref`.
+
+    Parameters
+    ----------
+    t: array_like, shape (N,)
+        Sorted sample times
+    t_ref: array_like, shape (M,)
+        Common time grid
+
+    Return
+    ------
+    index: int32 array, shape (M,)
+        Left neighbour of each grid time in `t`
+    weight: float64 array, shape (M,)
+        Weight of the right neighbour, NaN outside of `t`; f8 doubles
+        the storage of f4, which would leave gathered data ~1e-8 off
+    """
+    t = t.astype("f8")
+    t_ref = t_ref.astype("f8")
+    index = np.searchsorted(t, t_ref, side="right") - 1
+    valid = (index >= 0) & (t_ref <= t[-1])
+    index = np.clip(index, 0, len(t) - 2)
+    weight = (t_ref - t[index]) / (t[index + 1] - t[index])
+    weight[~valid] = np.nan
+    return index.astype("i4"), weight
+
+
+def align(y, index, weight, offset=0):
+    r"""
+    Gather `y` onto the common grid of an alignment table.
+
+    Parameters
+    ----------
+    y: array_like, shape (N, ...)
+        Signal, whose first row is sample `offset` of the table
+    index, weight: array_like, shape (M,)
+        Alignment table from `alignment_table`
+    offset: int
+        Index of the first row of `y` when only a slice was read
+
+    Return
+    ------
+    yout: array_like, shape (M, ...)
+        Aligned signal, astropy.Quantity are preserved
+    """
+    i = index - offset
+    w = weight.astype("f8", copy=False).reshape((-1,) + (1,) * (y.ndim - 1))
+    yout = y[i] * (1 - w) + y[i + 1] * w
+    # Exact hits must not pick up NaN from their right neighbour
+    exact = weight == 0
+    yout[exact] = y[i[exact]]
+    return yout
@@ -0,0 +1,130 @@
+r"""Four-spacecraft curlometer on stacked (N, 4, 3) probe arrays"""
+
+__all__ = ["reciprocal_vectors", "tetrahedron_quality", "curlometer"]
+
+import astropy.constants as c
+import astropy.units as u
+import numpy as np
+
+J_unit = u.Unit("nA m-2")
+JdE_unit = u.Unit("nW m-3")
+
+
+def reciprocal_vectors(R):
+    r"""
+    Calculate the reciprocal vectors of the tetrahedron at every sample.
+    For reference see Chapter 14 of Paschmann & Daly (1998), "Analysis
+    Methods for Multi-Spacecraft Data", ISSI Scientific Report, SR-001.
+
+    Parameters
+    ----------
+    R: array_like, shape (N, 4, 3)
+        Positions of the 4 probes
+
+    Return
+    ------
+    K: array_like, shape (N, 4, 3)
+        Reciprocal vectors k_1, ..., k_4 in units of 1 / R.unit
+    """
+    # Rows of dR are R_1a = R_a - R_1 (a = 2, 3, 4), so the columns of its
+    # inverse are k_2, k_3, k_4 (k_b . R_1a = delta_ab)
+    dR = R[:, 1:, :] - R[:, :1, :]
+    # Samples with missing positions (e.g. interval edges) are left as NaN
+    valid = np.isfinite(dR).all(axis=(1, 2))
+    K = np.full(R.shape, np.nan)
+    K[valid, 1:, :] = np.swapaxes(np.linalg.inv(dR[valid]), -1, -2)
+    K[:, 0, :] = -K[:, 1:, :].sum(axis=1)
+    return K
+
+
+def tetrahedron_quality(R):
+    r"""
+    Calculate the elongation and planarity of the tetrahedron from the
+    eigenvalues of the volumetric tensor (Robert et al., 1998).
+
+    Parameters
+    ----------
+    R: array_like, shape (N, 4, 3)
+        Positions of the 4 probes
+
+    Return
+    ------
+    elongation, planarity: array_like, shape (N,)
+    """
+    dR = R - R.mean(axis=1, keepdims=True)
+    Rvol = np.einsum("nai,naj->nij", dR, dR) / 4
+    valid = np.isfinite(Rvol).all(axis=(1, 2))
+    # Semiaxes of the pseudo-ellipsoid in ascending order
+    axes = np.full((len(R), 3), np.nan)
+    axes[valid] = np.sqrt(np.clip(np.linalg.eigvalsh(Rvol[valid]), 0, None))
+    c_, b_, a_ = axes.T
+    return 1 - b_ / a_, 1 - c_ / b_
+
+
+def curlometer(B, R, E=None):
+    r"""
+    Calculate the curlometer current density, its divergence error and
+    the field-aligned projections in a single pass over stacked probe data.
+
+    Parameters
+    ----------
+    B: Quantity, shape (N, 4, 3)
+        Magnetic field at the 4 probes
+    R: Quantity, shape (N, 4, 3)
+        Positions of the 4 probes
+    E: Quantity, shape (N, 4, 3), optional
+        Electric field at the 4 probes. If given, E_para and J.E are
+        also calculated
+
+    Return
+    ------
+    curlometer: dict
+        Contains B_bc, R_bc, J_clm, J_err, J_para, elongation, planarity
+        and, if E is given, E_bc, E_para, JdE, JdE_para, JdE_perp
+    """
+    B_unit, R_unit = B.unit, R.unit
+    B = B.value
+    R = R.value
+
+    K = reciprocal_vectors(R)
+    elongation, planarity = tetrahedron_quality(R)
+
+    # Gradient tensor G_ij = sum_a k_ai B_aj yields both div and curl
+    G = np.einsum("nai,naj->nij", K, B)
+    factor = (B_unit / R_unit / c.si.mu0).to_value(J_unit)
+    J_err = factor * np.trace(G, axis1=1, axis2=2)
+    J_clm = np.empty((len(G), 3))
+    J_clm[:, 0] = G[:, 1, 2] - G[:, 2, 1]
+    J_clm[:, 1] = G[:, 2, 0] - G[:, 0, 2]
+    J_clm[:, 2] = G[:, 0, 1] - G[:, 1, 0]
+    J_clm *= factor
+
+    B_bc = B.mean(axis=1)
+    b_hat = B_bc / np.linalg.norm(B_bc, axis=-1, keepdims=True)
+    J_para = np.einsum("ni,ni->n", J_clm, b_hat)
+    data = dict(
+        B_bc=B_bc * B_unit,
+        R_bc=R.mean(axis=1) * R_unit,
+        J_clm=J_clm * J_unit,
+        J_err=J_err * J_unit,
+        J_para=J_para * J_unit,
+        elongation=elongation,
+        planarity=planarity,
+    )
+    if E is None:
+        return data
+
+    E_unit = E.unit
+    E_bc = E.value.mean(axis=1)
+    E_para = np.einsum("ni,ni->n", E_bc, b_hat)
+    factor = (J_unit * E_unit).to(JdE_unit)
+    JdE = factor * np.einsum("ni,ni->n", J_clm, E_bc)
+    JdE_para = factor * J_para * E_para
+    data.update(
+        E_bc=E_bc * E_unit,
+        E_para=E_para * E_unit,
+        JdE=JdE * JdE_unit,
+        JdE_para=JdE_para * JdE_unit,
+        JdE_perp=(JdE - JdE_para) * JdE_unit,
+    )
+    return data
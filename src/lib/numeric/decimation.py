@@ -0,0 +1,162 @@
+r"""Plotting data reduced to the resolution it is drawn at"""
+
+__all__ = [
+    "time_bins",
+    "minmax_envelope",
+    "bin_average",
+    "read_decimated",
+]
+
+import astropy.units as u
+import numpy as np
+
+from lib.utils import read_data, read_size
+
+from .pyramid import lod_rows
+
+
+def time_bins(trange, n):
+    r"""Edges of `n` uniform bins over `trange` in f8 nanoseconds"""
+    trange = np.asarray(trange)
+    if np.issubdtype(trange.dtype, np.datetime64):
+        trange = trange.astype("datetime64[ns]")
+    return np.linspace(*trange.astype("f8"), n + 1)
+
+
+def bin_starts(t, bins):
+    # Bin of each sample (t sorted and inside bins) and first sample of each
+    # non-empty bin
+    b = np.clip(np.searchsorted(bins, t, side="right") - 1, 0, len(bins) - 2)
+    starts = np.flatnonzero(np.diff(b, prepend=-1))
+    return b, starts
+
+
+def minmax_envelope(t, y, bins):
+    r"""
+    First, minimum, maximum and last sample of each time bin (M4). With a
+    bin per pixel column, a line through these points covers the same
+    pixels as the full series.
+
+    Parameters
+    ----------
+    t: array_like, shape (N,)
+        Sorted f8 nanosecond times
+    y: array_like, shape (N, ...)
+        Series; NaN are ignored by the minimum and maximum
+    bins: array_like, shape (n + 1,)
+        Time bin edges, see `time_bins`
+
+    Return
+    ------
+    t_out: array_like, shape (4 m,)
+    y_out: array_like, shape (4 m, ...)
+        Envelope over the m non-empty bins
+    """
+    inside = (bins[0] <= t) & (t <= bins[-1])
+    t, y = t[inside], y[inside]
+    unit = getattr(y, "unit", None)
+    y = np.asarray(u.Quantity(y).value if unit is not None else y)
+    if len(t) == 0:
+        return t, y if unit is None else y * unit
+
+    _, starts = bin_starts(t, bins)
+    stops = np.append(starts[1:], len(t)) - 1
+    center = (t[starts] + t[stops]) / 2
+    with np.errstate(invalid="ignore"):
+        y_min = np.fmin.reduceat(y, starts, axis=0)
+        y_max = np.fmax.reduceat(y, starts, axis=0)
+
+    t_out = np.stack((t[starts], center, center, t[stops]), axis=1)
+    y_out = np.stack((y[starts], y_min, y_max, y[stops]), axis=1)
+    y_out = y_out.reshape(-1, *y.shape[1:])
+    return t_out.ravel(), y_out if unit is None else y_out * unit
+
+
+def bin_average(t, y, bins):
+    r"""
+    Mean of the finite samples in each time bin, for spectrogram tiles.
+
+    Return
+    ------
+    t_out: array_like, shape (n,)
+        Bin centers
+    y_out: array_like, shape (n, ...)
+        Bin means, NaN in empty bins
+    """
+    inside = (bins[0] <= t) & (t <= bins[-1])
+    t, y = t[inside], y[inside]
+    unit = getattr(y, "unit", None)
+    y = np.asarray(u.Quantity(y).value if unit is not None else y)
+
+    y_out = np.full((len(bins) - 1, *y.shape[1:]), np.nan)
+    if len(t) > 0:
+        b, starts = bin_starts(t, bins)
+        valid = np.isfinite(y)
+        S = np.add.reduceat(np.where(valid, y, 0), starts, axis=0)
+        N = np.add.reduceat(valid, starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            y_out[b[starts]] = S / N
+
+    t_out = (bins[1:] + bins[:-1]) / 2
+    return t_out, y_out if unit is None else y_out * unit
+
+
+def read_decimated(where, name, n, trange=None, kind="envelope", func=None):
+    r"""
+    Read `{where}/{name}` over `trange` reduced to `n` time bins. The rows
+    are read from the coarsest level of its pyramid (see `write_pyramid`)
+    that still has 4 samples per bin for lines and 1 for spectrograms, or
+    from the series if it has no pyramid, so that any zoom reads about the
+    same number of rows. Series with fewer samples than the output are
+    returned as they are.
+
+    Parameters
+    ----------
+    where: str
+        Group holding the series and its times as `{where}/t`
+    name: str
+        Series to read
+    n: int
+        Number of time bins, e.g. the width of the panel in pixels
+    trange: array_like, optional
+        Start and stop as datetime64 or f8 nanoseconds; defaults to the
+        whole series
+    kind: "envelope", "average"
+        `minmax_envelope` for line plots or `bin_average` for spectrograms
+    func: callable, optional
+        Applied to the series before the reduction, e.g. `magnitude`; its
+        pyramid is that of `{name}_{func.__name__}`
+
+    Return
+    ------
+    t: array_like
+        f8 nanosecond times
+    y: array_like
+        Reduced series
+    """
+    if trange is None:
+        N = read_size(f"{where}/t")
+        trange = read_data(f"{where}/t", [0, N - 1])
+    bins = time_bins(trange, n)
+    reduce = minmax_envelope if kind == "envelope" else bin_average
+    size = 4 * n if kind == "envelope" else n
+    key = name if func is None else f"{name}_{func.__name__}"
+    level, rows = lod_rows(f"{where}/{key}", size, trange=bins[[0, -1]])
+
+    if level == 0:
+        t = read_data(f"{where}/t", rows)
+        y = read_data(f"{where}/{name}", rows)
+        if func is not None:
+            y = func(y)
+        if len(t) <= size:
+            return t, y
+        return reduce(t, y, bins)
+
+    lod = f"{where}/lod/{key}/{level}"
+    t = read_data(f"{lod}/t", rows)
+    if kind == "average":
+        return reduce(t, read_data(f"{lod}/mean", rows), bins)
+    # Each block as its minimum and maximum, so that bins keep the extrema
+    lo, hi = read_data(f"{lod}/min", rows), read_data(f"{lod}/max", rows)
+    y = np.stack((lo, hi), axis=1).reshape(-1, *lo.shape[1:])
+    return reduce(np.repeat(t, 2), y, bins)
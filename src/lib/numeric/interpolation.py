@@ -0,0 +1,41 @@
+r"""Interpolation of signals onto a coarser time grid"""
+
+__all__ = ["box_interpol"]
+
+import astropy.units as u
+import numpy as np
+
+
+def box_interpol(y, x, xout, w):
+    r"""
+    Same as tvolib's `interpol(y, x, xout, window="box")`, but with a fixed
+    window of `w` samples rather than one from the sampling periods of `x`
+    and `xout`, so that chunks of an interval share the window of the
+    whole interval.
+
+    Parameters
+    ----------
+    y: array_like, shape (N, ...)
+        Signal, first axis is time
+    x: array_like, shape (N,)
+        Times of `y`, as datetime64[ns] or f8 nanoseconds
+    xout: array_like, shape (M,)
+        Times to interpolate on, as `x`
+    w: int
+        Width of the box window in samples of `x`
+
+    Return
+    ------
+    yout: array_like, shape (M, ...)
+        Box-averaged signal at `xout`, NaN outside `x`
+    """
+    from tvolib.numeric import move_avg
+
+    x, xout = np.asarray(x).astype("f8"), np.asarray(xout).astype("f8")
+    yout = np.empty((len(xout), *y.shape[1:]))
+    for i in np.ndindex(y.shape[1:]):
+        yin = move_avg(np.asarray(y[(slice(None), *i)]), (w,))
+        yout[(slice(None), *i)] = np.interp(
+            xout, x, np.asarray(yin), left=np.nan, right=np.nan
+        )
+    return yout * y.unit if isinstance(y, u.Quantity) else yout
@@ -0,0 +1,264 @@
+r"""Level-of-detail pyramids of time series and spectra"""
+
+__all__ = [
+    "Pyramid",
+    "pyramid_levels",
+    "magnitude",
+    "write_pyramid",
+    "lod_rows",
+    "read_lod",
+]
+
+import astropy.units as u
+import h5py as h5
+import numpy as np
+
+import lib
+from lib.utils import append_data, read_data, read_index, read_size
+
+# Samples aggregated per sample of the next level
+factor = 4
+# Levels stop once they are shorter than this
+min_size = 256
+# Rows of the series read at once by write_pyramid
+chunk_size = 2**18
+
+
+class Pyramid:
+    r"""
+    Levels of a series of `size` samples, built from its consecutive chunks
+    with bounded memory: each level keeps the sums, counts and extrema of
+    the samples of the previous level that do not fill a block yet.
+
+    Parameters
+    ----------
+    size: int
+        Samples of the whole series
+    t0: float
+        f8 nanosecond time of its first sample
+    log: bool
+        Average log10(y) instead of y, for spectra
+    """
+
+    def __init__(self, size, t0, log=False):
+        self.levels = 0
+        while size > min_size:
+            size = -(-size // factor)
+            self.levels += 1
+        self.t0 = t0
+        self.log = log
+        self.pending = [None] * self.levels
+
+    def sums(self, t, y):
+        value = np.asarray(y, dtype="f8")
+        if self.log:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                value = np.log10(np.where(value > 0, value, np.nan))
+        finite = np.isfinite(value)
+        # Times relative to the first sample keep the sums precise in f8
+        sums = dict(
+            T=np.asarray(t, dtype="f8") - self.t0,
+            M=np.ones(len(t)),
+            S=np.where(finite, value, 0),
+            N=finite.astype("f8"),
+        )
+        if not self.log:
+            sums.update(lo=value, hi=value)
+        return sums
+
+    def update(self, t, y, final=False):
+        r"""
+        Add the next chunk of the series.
+
+        Parameters
+        ----------
+        t: array_like, shape (n,)
+            f8 nanosecond times
+        y: array_like, shape (n, ...)
+            Series; NaN are ignored
+        final: bool
+            Whether this is the last chunk, closing the partial blocks
+
+        Return
+        ------
+        levels: list of dict
+            New rows of levels 1, 2, ... (level 0 being the series itself):
+            t (block mean time), mean, and min/max unless `log`
+        """
+        sums, levels = self.sums(t, y), []
+        for k in range(self.levels):
+            if self.pending[k] is not None:
+                sums = {
+                    key: np.concatenate((self.pending[k][key], value))
+                    for key, value in sums.items()
+                }
+            n = len(sums["T"])
+            if not final:
+                n -= n % factor
+            self.pending[k] = {key: value[n:] for key, value in sums.items()}
+            sums = reduce({key: value[:n] for key, value in sums.items()})
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums["S"] / sums["N"]
+            level = dict(
+                t=self.t0 + sums["T"] / sums["M"],
+                mean=10**mean if self.log else mean,
+            )
+            if not self.log:
+                level.update(min=sums["lo"], max=sums["hi"])
+            levels.append(level)
+
+        return levels
+
+
+def reduce(sums):
+    # Sums and extrema of blocks of `factor` samples
+    if len(sums["T"]) == 0:
+        return sums
+    starts = np.arange(0, len(sums["T"]), factor)
+    out = {
+        key: np.add.reduceat(sums[key], starts, axis=0)
+        for key in ["T", "M", "S", "N"]
+    }
+    if "lo" in sums:
+        with np.errstate(invalid="ignore"):
+            out["lo"] = np.fmin.reduceat(sums["lo"], starts, axis=0)
+            out["hi"] = np.fmax.reduceat(sums["hi"], starts, axis=0)
+    return out
+
+
+def pyramid_levels(t, y, log=False):
+    r"""
+    Aggregate a series by `factor` repeatedly, each level from the sums,
+    counts and extrema of the previous one.
+
+    Parameters
+    ----------
+    t: array_like, shape (N,)
+        f8 nanosecond times
+    y: array_like, shape (N, ...)
+        Series; NaN are ignored
+    log: bool
+        Average log10(y) instead of y, for spectra
+
+    Return
+    ------
+    levels: list of dict
+        t (block mean time), mean, and min/max unless `log`, for levels
+        1, 2, ... (level 0 being the series itself)
+    """
+    t = np.asarray(t, dtype="f8")
+    pyramid = Pyramid(len(t), t[0] if len(t) > 0 else 0, log=log)
+    return pyramid.update(t, y, final=True)
+
+
+def magnitude(y):
+    r"""Norm of vectors along the last axis, e.g. |B| of B_bc"""
+    return np.linalg.norm(y, axis=-1)
+
+
+def write_pyramid(h5f, where, name, log=False, func=None):
+    r"""
+    Write the pyramid of `{where}/{name}` of an open postprocess file as
+    `{where}/lod/{name}/{level}/{t,mean,min,max}`, with the unit of the
+    series. The series is read `chunk_size` rows at a time. With `func`,
+    e.g. `magnitude`, the pyramid is of `func` of the series and is named
+    `{name}_{func.__name__}`.
+    """
+    h5t, h5d = h5f[f"{where}/t"], h5f[f"{where}/{name}"]
+    key = name if func is None else f"{name}_{func.__name__}"
+    if (lod := f"{where}/lod/{key}") in h5f:
+        del h5f[lod]
+
+    N = h5t.shape[0]
+    pyramid = Pyramid(N, h5t[0] if N > 0 else 0, log=log)
+    unit = u.Unit(h5d.attrs["unit"]) if "unit" in h5d.attrs else None
+    for start in range(0, max(N, 1), chunk_size):
+        rows = slice(start, start + chunk_size)
+        y = h5d[rows] if func is None else func(h5d[rows])
+        levels = pyramid.update(h5t[rows], y, final=rows.stop >= N)
+        for k, level in enumerate(levels, 1):
+            for stat, value in level.items():
+                if stat != "t" and unit is not None:
+                    value = value * unit
+                append_data(h5f, f"{lod}/{k}/{stat}", value)
+    h5f.require_group(lod).attrs["levels"] = pyramid.levels
+
+
+def lod_rows(where, n, trange=None):
+    r"""
+    Coarsest level of the pyramid of `where` that still has `n` samples
+    over `trange`, and its rows in `trange`.
+
+    Parameters
+    ----------
+    where: str
+        Series as given to `read_data`, with its times in the same group;
+        only its pyramid needs to exist for levels above 0
+    n: int
+        Samples wanted over `trange`
+    trange: array_like, optional
+        Start and stop as datetime64 or f8 nanoseconds; defaults to the
+        whole series
+
+    Return
+    ------
+    level: int
+        Pyramid level, 0 for the series itself
+    rows: slice
+        Rows of the level in `trange`
+    """
+    group, name = where.rstrip("/").rsplit("/", 1)
+    if trange is None:
+        size = read_size(f"{group}/t")
+        trange = read_data(f"{group}/t", [0, size - 1])
+    trange = np.asarray(trange)
+    if np.issubdtype(trange.dtype, np.datetime64):
+        trange = trange.astype("datetime64[ns]")
+    start, stop = trange.astype("f8")
+
+    # Level 0 samples in range set the level; each level has 1/factor of them
+    i = read_index(f"{group}/t", start, side="left")
+    j = read_index(f"{group}/t", stop, side="right")
+    level = int(np.log(max(j - i, 1) / n) // np.log(factor)) if j > i else 0
+    with h5.File(lib.data_file, "r") as h5f:
+        lod = h5f.get(f"{group}/lod/{name}")
+        level = min(max(level, 0), 0 if lod is None else lod.attrs["levels"])
+    if level == 0:
+        return 0, slice(i, j)
+
+    lod = f"{group}/lod/{name}/{level}"
+    i = read_index(f"{lod}/t", start, side="left")
+    j = read_index(f"{lod}/t", stop, side="right")
+    return level, slice(i, j)
+
+
+def read_lod(where, n, trange=None, stat="mean"):
+    r"""
+    Read a dataset of `lib.data_file` as `read_data` does, but at the
+    coarsest level of its pyramid that still has `n` samples (e.g. pixels)
+    over `trange`, so that any zoom costs about the same I/O.
+
+    Parameters
+    ----------
+    where: str
+        Dataset as given to `read_data`, with its times in the same group
+    n: int
+        Samples wanted over `trange`
+    trange: array_like, optional
+        Start and stop as datetime64 or f8 nanoseconds; defaults to the
+        whole series
+    stat: "mean", "min", "max", "t"
+        Aggregate to read from the pyramid level, or its times; the level is
+        the same for all of them
+
+    Return
+    ------
+    data: array_like
+        Values as returned by `read_data`
+    """
+    group, name = where.rstrip("/").rsplit("/", 1)
+    level, rows = lod_rows(where, n, trange=trange)
+    if level == 0:
+        return read_data(f"{group}/t" if stat == "t" else where, rows)
+    return read_data(f"{group}/lod/{name}/{level}/{stat}", rows)
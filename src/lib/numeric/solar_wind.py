@@ -0,0 +1,161 @@
+r"""Survey-wide OMNI timeline and time-lagged lookups at spacecraft times"""
+
+__all__ = ["merge_timeline", "SolarWind", "read_solar_wind"]
+
+from functools import lru_cache
+
+import astropy.units as u
+import h5py as h5
+import numpy as np
+
+import lib
+
+
+def merge_timeline(segments):
+    r"""
+    Concatenate per-interval OMNI records into one sorted timeline without
+    the records repeated where intervals overlap.
+
+    Parameters
+    ----------
+    segments: list of dict
+        Per-interval data with f8 nanosecond times under "t", in interval
+        order; empty for intervals without data
+
+    Return
+    ------
+    timeline: dict
+        Concatenated data
+    rows: int64 array, shape (N, 2)
+        Row range of the timeline owned by each interval. Overlapping
+        records belong to the first interval holding them.
+    """
+    # Empty segments (failed downloads) own no rows
+    order = sorted(
+        (i for i, segment in enumerate(segments) if len(segment) > 0),
+        key=lambda i: segments[i]["t"][0] if len(segments[i]["t"]) else 0,
+    )
+    rows = np.zeros((len(segments), 2), dtype="i8")
+    keep = {}
+    t_max, size = -np.inf, 0
+    for i in order:
+        t = segments[i]["t"]
+        keep[i] = np.flatnonzero(t > t_max)
+        rows[i] = size, size + len(keep[i])
+        if len(keep[i]) > 0:
+            t_max, size = t[keep[i][-1]], size + len(keep[i])
+
+    # Variables of any segment, so that no data gives empty records
+    first = next((s for s in segments if len(s) > 0), dict(t=np.empty(0)))
+    timeline = {
+        key: np.concatenate(
+            [first[key][:0], *(segments[i][key][keep[i]] for i in order)]
+        )
+        for key in first
+    }
+    return timeline, rows
+
+
+class SolarWind:
+    r"""
+    Solar-wind conditions at arbitrary times from a sorted OMNI timeline.
+    Windowed averages use prefix sums, so a lookup costs two binary searches
+    per timestamp regardless of the window length.
+
+    Parameters
+    ----------
+    t: array_like
+        Sorted f8 nanosecond times of the records
+    data: dict
+        Records of each variable, with time along the first axis
+    cadence: astropy.units.Quantity, optional
+        Record length; defaults to the median spacing of `t`
+    """
+
+    def __init__(self, t, data, cadence=None):
+        self.t = np.asarray(t, dtype="f8")
+        self.data = data
+        if cadence is None:
+            self.cadence = np.median(np.diff(self.t))
+        else:
+            self.cadence = cadence.to_value(u.ns)
+        self.prefix = {}
+
+    def cumulative(self, key):
+        r"""Prefix sums of the finite values of `key` and of their count"""
+        if key not in self.prefix:
+            value = u.Quantity(self.data[key]).value
+            finite = np.isfinite(value)
+            zero = np.zeros((1, *value.shape[1:]))
+            self.prefix[key] = (
+                np.concatenate(
+                    (zero, np.cumsum(np.where(finite, value, 0), 0))
+                ),
+                np.concatenate((zero, np.cumsum(finite, 0))),
+            )
+        return self.prefix[key]
+
+    def __call__(self, t, keys=None, lag=0 * u.s, window=None):
+        r"""
+        Parameters
+        ----------
+        t: array_like
+            Spacecraft times, datetime64 or f8 nanoseconds
+        keys: list of str, optional
+            Variables to look up; defaults to all of them
+        lag: astropy.units.Quantity, optional
+            Propagation delay; the conditions at `t` are taken from the OMNI
+            records at `t - lag`
+        window: astropy.units.Quantity, optional
+            Average the records starting within `window` before `t - lag`
+            instead of taking the record that contains it
+
+        Return
+        ------
+        conditions: dict
+            Values at `t`, NaN where the timeline has no valid record
+        """
+        t = np.asarray(t)
+        if np.issubdtype(t.dtype, np.datetime64):
+            t = t.astype("datetime64[ns]").astype("i8")
+        t = t.astype("f8") - lag.to_value(u.ns)
+        keys = self.data.keys() if keys is None else keys
+
+        conditions = {}
+        if window is None:
+            i = np.searchsorted(self.t, t, side="right") - 1
+            valid = (i >= 0) & (t - self.t[np.maximum(i, 0)] < self.cadence)
+            i = np.where(valid, i, 0)
+            for key in keys:
+                value = self.data[key][i].astype("f8")
+                value[~valid] = np.nan
+                conditions[key] = value
+            return conditions
+
+        lo = np.searchsorted(self.t, t - window.to_value(u.ns), side="left")
+        hi = np.searchsorted(self.t, t, side="left")
+        for key in keys:
+            S, N = self.cumulative(key)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                value = (S[hi] - S[lo]) / (N[hi] - N[lo])
+            unit = getattr(self.data[key], "unit", None)
+            conditions[key] = value if unit is None else value * unit
+        return conditions
+
+
+@lru_cache(maxsize=1)
+def read_solar_wind(where="/omni/timeline"):
+    r"""
+    OMNI timeline written by `scripts/collect_omni.py`, read once per
+    process. The returned lookup is shared, so its data must not be modified.
+    """
+    data = {}
+    with h5.File(lib.data_file, "r") as h5f:
+        for key, h5d in h5f[where].items():
+            if key in ["t", "rows"]:
+                continue
+            data[key] = h5d[()]
+            if "unit" in h5d.attrs:
+                data[key] = data[key] * u.Unit(h5d.attrs["unit"])
+        t = h5f[f"{where}/t"][()]
+    return SolarWind(t, data)
@@ -0,0 +1,35 @@
+r"""Calendar features from epoch seconds"""
+
+__all__ = [
+    "epoch_seconds",
+    "day_of_year",
+]
+
+import numpy as np
+
+
+def epoch_seconds(t):
+    r"""
+    Seconds since 1970-01-01 as float64, from datetime64 or from the f8
+    nanosecond timestamps stored in the h5 files.
+    """
+    if np.issubdtype(np.asarray(t).dtype, np.datetime64):
+        t = t.astype("datetime64[ns]").astype("i8")
+    return np.asarray(t, dtype="f8") / 1e9
+
+
+def day_of_year(t):
+    r"""
+    Day of year (1 on January 1st) from epoch seconds, with the integer
+    civil-from-days algorithm of H. Hinnant instead of datetime64 casts.
+    """
+    days = np.floor_divide(np.floor(t).astype("i8"), 86400) + 719468
+    era = np.floor_divide(days, 146097)
+    doe = days - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    # Day of a year starting on March 1st
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    march = doy < 306
+    year = yoe + era * 400 + ~march
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return np.where(march, doy + 60 + leap, doy - 305)
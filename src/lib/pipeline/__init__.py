@@ -0,0 +1,11 @@
+from lib import lazy
+
+# Submodule of each name, imported on first use
+exports = dict(
+    Journal="journal",
+    Script="runner",
+    Task="runner",
+    run_pipeline="runner",
+)
+__all__ = list(exports)
+__getattr__, __dir__ = lazy(__name__, exports)
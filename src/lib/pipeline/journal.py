@@ -0,0 +1,86 @@
+r"""Append-only record of finished pipeline tasks and their fingerprints"""
+
+__all__ = ["Journal", "stat", "content_hash", "sources_hash"]
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import lib
+
+
+def stat(path):
+    r"""Size and modification time of a file or directory, None if missing"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def content_hash(path):
+    r"""
+    SHA-1 of the bytes of a file, or of the sorted entries of a directory
+    (whose fingerprint is then the set of files it holds).
+    """
+    sha = hashlib.sha1()
+    path = Path(path)
+    if path.is_dir():
+        for name in sorted(os.listdir(path)):
+            sha.update(name.encode() + b"\0")
+        return sha.hexdigest()
+
+    with open(path, "rb") as f:
+        while chunk := f.read(2**24):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def sources_hash(paths):
+    r"""SHA-1 of the source files a task depends on, read once per process"""
+    sha = hashlib.sha1()
+    for path in paths:
+        sha.update(Path(path).read_bytes())
+    return sha.hexdigest()
+
+
+class Journal:
+    r"""
+    Line-delimited JSON journal of task runs. Each finished task is
+    appended and flushed to disk at once, so that a crashed or interrupted
+    pipeline resumes from the tasks it completed; the last record of a
+    task wins.
+    """
+
+    def __init__(self, path=None):
+        # Defaults to lib.journal_file, resolved here rather than on import
+        self.path = Path(path or lib.journal_file)
+        self.records = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Truncated last line of a crashed run
+                        continue
+                    self.records[record["task"]] = record
+            # Terminate a truncated line so that appends start on a new one
+            with open(self.path, "rb+") as f:
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+
+    def __getitem__(self, name):
+        return self.records.get(name)
+
+    def append(self, record):
+        self.records[record["task"]] = record
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,328 @@
+r"""Run pipeline tasks whose code, parameters or inputs changed"""
+
+__all__ = ["Task", "Script", "run_pipeline"]
+
+import hashlib
+import heapq
+import importlib.util
+import inspect
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+import numpy as np
+from pathos.pools import ProcessPool as Pool
+
+from .journal import Journal, content_hash, sources_hash, stat
+
+
+class Task:
+    r"""
+    One unit of a pipeline stage, e.g. one probe and interval of a collect
+    script, with what decides whether it is up to date.
+
+    Parameters
+    ----------
+    name: str
+        Unique name, e.g. "collect_fgm/mms1/interval_0"
+    func: callable
+        Called as `func(*args, **kwargs)` in a pool worker
+    args, kwargs: optional
+        Arguments of `func`, part of the fingerprint
+    inputs: list of path, optional
+        Files or directories not produced by other tasks; compared by size
+        and mtime, then by content if those differ
+    outputs: list of path, optional
+        Files that must exist for the task to be up to date
+    deps: list of str, optional
+        Tasks whose results this one uses; it is stale once they run again
+    after: list of str, optional
+        Tasks that must finish first without being dependencies, e.g.
+        because they write to the same file
+    code: list of path, optional
+        Sources fingerprinting the task; defaults to the module of `func`
+    exclusive: bool, optional
+        Run alone in the main process, for stages with their own pool
+    cost: float, optional
+        Estimated run time in any unit shared by the tasks, e.g. the
+        interval duration; replaced by the last recorded run time
+    """
+
+    def __init__(
+        self,
+        name,
+        func,
+        args=(),
+        kwargs=None,
+        inputs=(),
+        outputs=(),
+        deps=(),
+        after=(),
+        code=None,
+        exclusive=False,
+        cost=0,
+    ):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.inputs = [str(path) for path in inputs]
+        self.outputs = [str(path) for path in outputs]
+        self.deps = list(deps)
+        self.after = list(after)
+        if code is None and isinstance(func, Script):
+            code = [func.path]
+        self.code = [str(path) for path in code or [inspect.getfile(func)]]
+        self.exclusive = exclusive
+        self.cost = cost
+
+    @property
+    def params(self):
+        return repr((self.args, sorted(self.kwargs.items())))
+
+
+class Script:
+    r"""
+    Function `name` of a script, imported on its first call in each process
+    with the script directory on `sys.path`. Without `name`, the script is
+    run as `__main__` in a subprocess from its directory.
+    """
+
+    def __init__(self, path, name=None):
+        self.path = Path(path)
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        if self.name is None:
+            subprocess.run(
+                [sys.executable, self.path.name],
+                cwd=self.path.parent,
+                check=True,
+            )
+            return
+
+        module_name = "_".join(self.path.with_suffix("").parts[-2:])
+        module_name = module_name.replace("-", "_")
+        if (module := sys.modules.get(module_name)) is None:
+            if (directory := str(self.path.parent)) not in sys.path:
+                sys.path.insert(0, directory)
+            spec = importlib.util.spec_from_file_location(
+                module_name, self.path
+            )
+            module = sys.modules[module_name] = (
+                importlib.util.module_from_spec(spec)
+            )
+            spec.loader.exec_module(module)
+        return getattr(module, self.name)(*args, **kwargs)
+
+    def __repr__(self):
+        return f"Script({self.path.name!r}, {self.name!r})"
+
+
+def execute(func, args, kwargs):
+    # Errors are returned rather than raised so that the pool keeps going
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+        error = None
+    except BaseException:
+        error = traceback.format_exc()
+    return error, time.perf_counter() - start
+
+
+def deps_hash(task, runs):
+    sha = hashlib.sha1()
+    for dep in sorted(task.deps):
+        sha.update(f"{dep}={runs.get(dep)}\n".encode())
+    return sha.hexdigest()
+
+
+def fingerprint(task, runs, record=None):
+    r"""
+    Fingerprint of `task` given the run ids of its dependencies. Inputs whose
+    size or mtime differ from `record` are hashed again.
+    """
+    inputs = {}
+    for path in task.inputs:
+        known = record and record["inputs"].get(path)
+        if (st := stat(path)) is None:
+            inputs[path] = None
+        elif known and known[0] == st:
+            inputs[path] = known
+        else:
+            inputs[path] = [st, content_hash(path)]
+    return dict(
+        code=sources_hash(tuple(task.code)),
+        params=task.params,
+        deps=deps_hash(task, runs),
+        inputs=inputs,
+    )
+
+
+def is_fresh(task, record, current):
+    if record is None or record["status"] != "done":
+        return False
+    if any(stat(path) is None for path in task.outputs):
+        return False
+    if any(record[key] != current[key] for key in ["code", "params", "deps"]):
+        return False
+    return all(
+        (old := record["inputs"].get(path)) is not None
+        and new is not None
+        and old[1] == new[1]
+        for path, new in current["inputs"].items()
+    )
+
+
+def run_pipeline(tasks, processes=8, journal=None, force=()):
+    r"""
+    Run the stale tasks of a pipeline, at most `processes` at once, in an
+    order respecting their dependencies and otherwise longest first. A task
+    is up to date when its last run succeeded with the same code,
+    parameters, inputs and dependency runs and its outputs exist. A failed
+    task is recorded and its dependents are skipped; the other tasks go on.
+
+    Parameters
+    ----------
+    tasks: list of Task
+    processes: int
+        Worker budget, also the share of an exclusive task
+    journal: Journal, optional
+        Defaults to `lib.data_dir / "pipeline.jsonl"`
+    force: list of str, optional
+        Prefixes of task names to run even if up to date
+
+    Return
+    ------
+    failed: list of str
+        Names of the tasks that failed
+    """
+    journal = journal or Journal()
+    tasks = {task.name: task for task in tasks}
+    runs = {
+        name: record["run"]
+        for name in tasks
+        if (record := journal[name]) is not None and record["status"] == "done"
+    }
+    waiting = {
+        name: {d for d in task.deps + task.after if d in tasks}
+        for name, task in tasks.items()
+    }
+    dependents = {name: [] for name in tasks}
+    for name, before in waiting.items():
+        for d in before:
+            dependents[d].append(name)
+
+    # Longest tasks first: their last run time, or else their cost at the
+    # median ratio of run time to cost of the tasks that did run
+    recorded = {
+        name: record["time"]
+        for name in tasks
+        if (record := journal[name]) is not None
+    }
+    ratios = [
+        recorded[name] / tasks[name].cost
+        for name in recorded
+        if tasks[name].cost > 0
+    ]
+    rate = np.median(ratios) if len(ratios) > 0 else 1
+    priority = {
+        name: recorded.get(name, task.cost * rate)
+        for name, task in tasks.items()
+    }
+
+    queue, inflight, failed, skipped = [], {}, [], set()
+    counts = dict(fresh=0, done=0)
+
+    def release(name):
+        for other in dependents[name]:
+            waiting[other].discard(name)
+            if not waiting[other]:
+                promote(other)
+
+    def promote(name):
+        task = tasks[name]
+        record = journal[name]
+        current = fingerprint(task, runs, record)
+        if not any(name.startswith(p) for p in force) and is_fresh(
+            task, record, current
+        ):
+            if record["inputs"] != current["inputs"]:
+                journal.append({**record, "inputs": current["inputs"]})
+            counts["fresh"] += 1
+            release(name)
+        else:
+            heapq.heappush(queue, (-priority[name], name, current))
+
+    def finish(name, current, error, elapsed):
+        run = uuid.uuid4().hex if error is None else None
+        journal.append(
+            dict(
+                task=name,
+                status="done" if error is None else "failed",
+                run=run,
+                time=elapsed,
+                error=error,
+                **current,
+            )
+        )
+        if error is None:
+            runs[name] = run
+            counts["done"] += 1
+            print(f"Done {name} in {elapsed:.1f} s", flush=True)
+            release(name)
+        else:
+            failed.append(name)
+            print(f"Failed {name}:\n{error}", flush=True)
+            stack = list(dependents[name])
+            while stack:
+                if (other := stack.pop()) not in skipped:
+                    skipped.add(other)
+                    stack.extend(dependents[other])
+
+    for name in [name for name, before in waiting.items() if not before]:
+        promote(name)
+
+    pool = Pool(processes)
+    while queue or inflight:
+        # Exclusive tasks wait for the pool to drain and block new work
+        if queue and tasks[queue[0][1]].exclusive:
+            if not inflight:
+                _, name, current = heapq.heappop(queue)
+                task = tasks[name]
+                finish(
+                    name, current, *execute(task.func, task.args, task.kwargs)
+                )
+                continue
+        else:
+            while queue and not tasks[queue[0][1]].exclusive:
+                if len(inflight) >= processes:
+                    break
+                _, name, current = heapq.heappop(queue)
+                task = tasks[name]
+                inflight[name] = (
+                    current,
+                    pool.apipe(execute, task.func, task.args, task.kwargs),
+                )
+
+        done = [
+            name for name, (_, result) in inflight.items() if result.ready()
+        ]
+        for name in done:
+            current, result = inflight.pop(name)
+            finish(name, current, *result.get())
+        if not done:
+            time.sleep(0.05)
+
+    pool.close()
+    pool.join()
+    pool.clear()
+    print(
+        f"{counts['done']} tasks run, {counts['fresh']} up to date, "
+        f"{len(failed)} failed, {len(skipped)} skipped.",
+        flush=True,
+    )
+    return failed
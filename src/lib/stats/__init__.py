@@ -0,0 +1,13 @@
+from lib import lazy
+
+# Submodule of each name, imported on first use
+exports = dict(
+    Bins="bins",
+    bin_index="histogram",
+    histogramdd="histogram",
+    Histogram="runner",
+    run_histograms="runner",
+    SparseHistogram="sparse",
+)
+__all__ = list(exports)
+__getattr__, __dir__ = lazy(__name__, exports)
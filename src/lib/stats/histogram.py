@@ -0,0 +1,117 @@
+r"""Single-pass multi-channel histograms on fixed bin edges"""
+
+__all__ = ["bin_index", "histogramdd", "quantiles"]
+
+import numpy as np
+
+from .bins import Bins
+
+
+def bin_index(sample, bins):
+    r"""
+    Flat bin index of every sample on a D-dimensional grid.
+
+    Parameters
+    ----------
+    sample: sequence of D array_like, shape (N,)
+        Coordinates of the samples
+    bins: sequence of D Bins or array_like
+        Bin edges along each axis
+
+    Return
+    ------
+    index: int64 array, shape (N,)
+        Flat (C-order) bin index, -1 outside of the grid
+    shape: tuple
+        Shape of the grid
+    """
+    bins = [b if isinstance(b, Bins) else Bins(b) for b in bins]
+    shape = tuple(b.size for b in bins)
+    index = np.zeros(len(sample[0]), dtype="i8")
+    valid = np.ones(len(sample[0]), dtype=bool)
+    for x, b in zip(sample, bins):
+        k = b.index(x)
+        valid &= (0 <= k) & (k < b.size)
+        index = index * b.size + k
+
+    index[~valid] = -1
+    return index, shape
+
+
+def histogramdd(sample, bins, weights=None):
+    r"""
+    Counts and weighted sums of several channels in one binning pass.
+    Results are identical to calling np.histogramdd once per channel.
+
+    Parameters
+    ----------
+    sample: sequence of D array_like, shape (N,)
+        Coordinates of the samples
+    bins: sequence of D Bins or array_like
+        Bin edges along each axis
+    weights: array_like, shape (N, C), optional
+        Weight channels
+
+    Return
+    ------
+    H: array_like, shape (n_1, ..., n_D)
+        Counts
+    H_w: array_like, shape (n_1, ..., n_D, C)
+        Weighted sums, only if `weights` is given
+    """
+    index, shape = bin_index(sample, bins)
+    valid = index >= 0
+    index = index[valid]
+    size = int(np.prod(shape))
+
+    H = np.bincount(index, minlength=size).astype("f8").reshape(shape)
+    if weights is None:
+        return H
+
+    weights = np.asarray(weights, dtype="f8")[valid]
+    H_w = np.empty((size, weights.shape[1]))
+    for c in range(weights.shape[1]):
+        H_w[:, c] = np.bincount(index, weights=weights[:, c], minlength=size)
+
+    return H, H_w.reshape(*shape, weights.shape[1])
+
+
+def quantiles(H, bins, levels):
+    r"""
+    Approximate quantiles from counts on fixed value bins, interpolated
+    linearly in the scale of the bins.
+
+    Parameters
+    ----------
+    H: array_like, shape (..., n)
+        Counts, with the value bins along the last axis
+    bins: Bins
+        Value bins
+    levels: array_like, shape (L,)
+        Quantile levels in [0, 1]
+
+    Return
+    ------
+    q: array_like, shape (..., L)
+        Quantiles in the unit of `bins`, NaN where there are no counts
+    """
+    cdf = np.cumsum(H, axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cdf = np.concatenate((np.zeros_like(cdf[..., :1]), cdf), axis=-1)
+        cdf = cdf / cdf[..., -1:]
+    grid = np.log10(bins.values) if bins.scale == "log" else bins.values
+
+    q = np.empty((*H.shape[:-1], len(levels)))
+    for i, level in enumerate(levels):
+        k = np.clip((cdf < level).sum(axis=-1, keepdims=True), 1, bins.size)
+        c0 = np.take_along_axis(cdf, k - 1, axis=-1)[..., 0]
+        c1 = np.take_along_axis(cdf, k, axis=-1)[..., 0]
+        k = k[..., 0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frac = np.clip((level - c0) / (c1 - c0), 0, 1)
+        q[..., i] = grid[k - 1] + frac * (grid[k] - grid[k - 1])
+
+    q[np.isnan(cdf[..., -1])] = np.nan
+    if bins.scale == "log":
+        q = 10**q
+    return q if bins.unit is None else q * bins.unit
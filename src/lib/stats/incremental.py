@@ -0,0 +1,198 @@
+r"""Per-interval histogram partials keyed by a content hash of their inputs"""
+
+__all__ = ["Reader", "update_partials", "read_total"]
+
+import hashlib
+import inspect
+import json
+import os
+
+import h5py as h5
+import numpy as np
+
+import lib
+from lib.utils import published, read_data, read_source, stage
+
+from .sparse import SparseHistogram
+
+signatures = {}
+
+
+class Reader:
+    r"""Memoized `read_data` that logs the datasets a loader asks for"""
+
+    def __init__(self):
+        self.cache = {}
+        self.datasets = []
+
+    def __call__(self, where, index=slice(None)):
+        key = (where, str(index))
+        if key not in self.cache:
+            # Datasets broadcast to the workers are sliced in shared memory
+            if (data := published(where)) is not None:
+                self.cache[key] = data[index]
+            else:
+                self.cache[key] = read_data(where, index)
+        if where not in self.datasets:
+            self.datasets.append(where)
+        return self.cache[key]
+
+    def arrays(self):
+        r"""Logged datasets that were read whole, by name"""
+        whole = str(slice(None))
+        return {
+            where: self.cache[(where, whole)]
+            for where in self.datasets
+            if (where, whole) in self.cache
+        }
+
+
+def signature(spec):
+    r"""Hash of a spec and of the source of the module defining its loader"""
+    if (key := id(spec)) in signatures:
+        return signatures[key]
+
+    sha = hashlib.sha1()
+    sha.update(inspect.getsource(inspect.getmodule(spec.loader)).encode())
+    sha.update(spec.loader.__qualname__.encode())
+    sha.update(
+        repr(
+            (spec.keys, spec.sample, spec.weights, spec.mask, spec.moments)
+        ).encode()
+    )
+    for b in (*spec.bins, *spec.quantiles.values()):
+        sha.update(f"{b.unit}_{b.scale}".encode())
+        sha.update(b.values.tobytes())
+    signatures[key] = sha.hexdigest()
+    return signatures[key]
+
+
+def content_hash(datasets, arrays=None):
+    # Datasets already in `arrays` (e.g. from a Reader) are not read again
+    arrays = arrays or {}
+    sha = hashlib.sha1()
+    with h5.File(lib.data_file, "r") as h5f:
+        for where in datasets:
+            data = arrays[where] if where in arrays else h5f[where][()]
+            sha.update(where.encode())
+            sha.update(
+                np.ascontiguousarray(getattr(data, "value", data)).tobytes()
+            )
+    return sha.hexdigest()
+
+
+def file_stats(datasets):
+    stats = {}
+    for fname in dict.fromkeys(read_source(where) for where in datasets):
+        stat = os.stat(fname)
+        stats[fname] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def inputs(datasets, arrays=None):
+    return dict(
+        datasets=datasets,
+        content=content_hash(datasets, arrays),
+        files=file_stats(datasets),
+    )
+
+
+def check(h5f, specs, interval):
+    r"""
+    Return "fresh" if the stored partials of `specs` are up to date, their
+    stored inputs if only a content check can tell, or None if they must be
+    recomputed.
+    """
+    meta = None
+    for spec in specs:
+        for key in spec.keys:
+            h5g = h5f.get(f"{key}/interval_{interval}")
+            if h5g is None or h5g.attrs["signature"] != signature(spec):
+                return None
+            meta = json.loads(h5g.attrs["inputs"])
+
+    try:
+        stats = {
+            f: [os.stat(f).st_size, os.stat(f).st_mtime_ns]
+            for f in meta["files"]
+        }
+    except FileNotFoundError:
+        return None
+
+    return "fresh" if stats == meta["files"] else meta
+
+
+def update_partials(specs, interval, checks):
+    r"""
+    Worker side of `run_histograms(..., incremental=True)`: recompute or
+    revalidate the partials of one interval for each group of `specs`
+    sharing a loader.
+
+    Return
+    ------
+    interval: int
+    results: list of (specs, partials, units, inputs)
+        `partials` is None when the content hash still matches
+    """
+    read = Reader()
+    results = []
+    for group, meta in checks:
+        group = [specs[i] for i in group]
+        if (
+            meta is not None
+            and content_hash(meta["datasets"]) == meta["content"]
+        ):
+            meta["files"] = file_stats(meta["datasets"])
+            results.append((group, None, {}, meta))
+            continue
+
+        read.datasets = []
+        with stage("load", interval=interval):
+            data = group[0].loader(interval, read)
+        partials, units = {}, {}
+        with stage("histogram", interval=interval):
+            for spec in group:
+                partials.update(spec.partials(data, units))
+        meta = inputs(read.datasets, read.arrays())
+        results.append((group, partials, units, meta))
+
+    return interval, results
+
+
+def write_partials(h5f, interval, group, partials, units, meta):
+    for spec in group:
+        for key in spec.keys:
+            where = f"{key}/interval_{interval}"
+            if partials is not None:
+                if where in h5f:
+                    del h5f[where]
+                H = partials[key]
+                h5f.create_dataset(f"{where}/index", data=H.index)
+                h5f.create_dataset(f"{where}/counts", data=H.counts)
+                h5f.create_dataset(f"{where}/sums", data=H.sums)
+                if H.M2 is not None:
+                    h5f.create_dataset(f"{where}/M2", data=H.M2)
+                h5f[where].attrs["shape"] = H.shape
+                h5f[where].attrs["signature"] = signature(spec)
+                _units = json.loads(h5f[key].attrs.get("units", "{}"))
+                _units.update(units)
+                h5f[key].attrs["units"] = json.dumps(_units)
+
+            h5f[where].attrs["inputs"] = json.dumps(meta)
+
+
+def read_partial(h5f, key, interval):
+    h5g = h5f[f"{key}/interval_{interval}"]
+    return SparseHistogram(
+        h5g.attrs["shape"],
+        h5g["index"][:],
+        h5g["counts"][:],
+        h5g["sums"][:],
+        h5g["M2"][:] if "M2" in h5g else None,
+    )
+
+
+def read_total(h5f, key, intervals, reduce):
+    r"""Sum of the stored partials under `key` over `intervals`"""
+    total = reduce([read_partial(h5f, key, i) for i in intervals])
+    return total, json.loads(h5f[key].attrs.get("units", "{}"))
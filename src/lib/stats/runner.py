@@ -0,0 +1,396 @@
+r"""Declarative histogram jobs accumulated over the survey intervals"""
+
+__all__ = ["Histogram", "run_histograms"]
+
+import astropy.units as u
+import h5py as h5
+import numpy as np
+from pathos.pools import ProcessPool as Pool
+
+import lib
+from lib.utils import (
+    broadcast,
+    interval_costs,
+    lpt_order,
+    lpt_shares,
+    published,
+    read_data,
+    read_num_intervals,
+    stage,
+)
+
+from .bins import Bins
+from .histogram import histogramdd, quantiles
+from .incremental import (
+    Reader,
+    check,
+    read_total,
+    update_partials,
+    write_partials,
+)
+from .sparse import SparseHistogram
+
+# Dataset whose number of rows estimates the cost of an interval
+cost_source = "mms1/ion-fpi-moms/interval_{}/t"
+
+
+class Histogram:
+    r"""
+    Counts and weighted sums of one sample on a fixed grid, written to
+    `lib.analysis_file` under `where`.
+
+    Parameters
+    ----------
+    where: str
+        Output group
+    loader: callable
+        `loader(interval, read)` returns a dict of variables for an interval,
+        where `read` is a memoized `lib.utils.read_data`. Specs sharing a
+        loader get its result from a single call.
+    sample: tuple of str
+        Variables giving the coordinates of the samples
+    bins: tuple of Bins or array_like
+        Bin edges along each coordinate
+    weights: dict, optional
+        Output name to variable of each weighted sum
+    mask: str, optional
+        Boolean variable selecting the samples
+    counts: str
+        Output name of the counts
+    grid: tuple of str, optional
+        Output names of the meshgrid of the left bin edges
+    sparse: bool
+        Accumulate only the touched cells, for large grids that each
+        interval covers a small part of
+    moments: bool
+        Also write the mean and standard deviation of every weight variable
+        per bin, as `{variable}_mean` and `{variable}_std`
+    quantiles: dict, optional
+        Variable to value Bins, for approximate quantiles per bin written as
+        `{variable}_quantiles` with the levels in `{variable}_levels`
+    levels: tuple of float
+        Quantile levels
+    shared: tuple of str, optional
+        Datasets the loader reads for every interval, e.g. a survey-wide
+        timeline that it slices; they are read once and broadcast to the
+        workers in shared memory
+    """
+
+    def __init__(
+        self,
+        where,
+        loader,
+        sample,
+        bins,
+        weights=None,
+        mask=None,
+        counts="H",
+        grid=None,
+        sparse=False,
+        moments=False,
+        quantiles=None,
+        levels=(0.1, 0.25, 0.5, 0.75, 0.9),
+        shared=(),
+    ):
+        self.where = where
+        self.loader = loader
+        self.sample = tuple(sample)
+        self.bins = tuple(b if isinstance(b, Bins) else Bins(b) for b in bins)
+        self.weights = dict(weights or {})
+        self.mask = mask
+        self.counts = counts
+        self.grid = grid
+        self.moments = moments
+        self.quantiles = {
+            name: b if isinstance(b, Bins) else Bins(b)
+            for name, b in (quantiles or {}).items()
+        }
+        self.levels = tuple(levels)
+        self.shared = tuple(shared)
+        # Moments and quantiles are only kept in sparse form
+        self.sparse = sparse or moments or len(self.quantiles) > 0
+
+    @property
+    def key(self):
+        return f"{self.where}/{self.counts}"
+
+    @property
+    def keys(self):
+        r"""Keys of the partials of this spec"""
+        return [self.key] + [
+            f"{self.where}/{name}_quantiles" for name in self.quantiles
+        ]
+
+    def arrays(self, data, units):
+        r"""Masked sample and weight channels, recording weight units"""
+        mask = slice(None) if self.mask is None else data[self.mask]
+        sample = [data[name][mask] for name in self.sample]
+        weights = None
+        if len(self.weights) > 0:
+            weights = np.empty((len(sample[0]), len(self.weights)))
+            for i, (key, name) in enumerate(self.weights.items()):
+                w = data[name][mask]
+                if isinstance(w, u.Quantity):
+                    units[f"{self.where}/{key}"] = str(w.unit)
+                    w = w.value
+                weights[:, i] = w
+
+        return sample, weights
+
+    def partials(self, data, units):
+        r"""Sparse histograms of one interval"""
+        sample, weights = self.arrays(data, units)
+        partials = {
+            self.key: SparseHistogram.from_samples(
+                sample, self.bins, weights, moments=self.moments
+            )
+        }
+        mask = slice(None) if self.mask is None else data[self.mask]
+        for name, b in self.quantiles.items():
+            partials[f"{self.where}/{name}_quantiles"] = (
+                SparseHistogram.from_samples(
+                    (*sample, data[name][mask]), (*self.bins, b)
+                )
+            )
+        return partials
+
+    def accumulate(self, data, partial, units):
+        r"""Add the histograms of one interval to `partial`"""
+        if self.sparse:
+            for key, value in self.partials(data, units).items():
+                add(partial, key, value)
+            return
+
+        sample, weights = self.arrays(data, units)
+        result = histogramdd(sample, self.bins, weights=weights)
+        H, H_w = result if weights is not None else (result, None)
+        add(partial, self.key, H)
+        for i, key in enumerate(self.weights.keys()):
+            add(partial, f"{self.where}/{key}", H_w[..., i])
+
+    def outputs(self, total, units):
+        r"""Datasets to write from the summed partials"""
+        if not isinstance(H := total[self.key], SparseHistogram):
+            keys = [f"{self.where}/{key}" for key in self.weights]
+            return {key: total[key] for key in [self.key] + keys}
+
+        outputs = {}
+        H_c, H_w = H.dense()
+        outputs[self.key] = H_c
+        for i, key in enumerate(self.weights.keys()):
+            outputs[f"{self.where}/{key}"] = H_w[..., i]
+
+        if self.moments:
+            mean, std = H.moments()
+            for i, (key, name) in enumerate(self.weights.items()):
+                unit = units.get(f"{self.where}/{key}")
+                for stat, value in dict(mean=mean, std=std).items():
+                    outputs[f"{self.where}/{name}_{stat}"] = value[..., i]
+                    if unit is not None:
+                        units[f"{self.where}/{name}_{stat}"] = unit
+
+        for name, b in self.quantiles.items():
+            key = f"{self.where}/{name}_quantiles"
+            outputs[key] = quantiles(total[key].dense()[0], b, self.levels)
+            outputs[f"{self.where}/{name}_levels"] = np.array(self.levels)
+
+        return outputs
+
+    def meshgrid(self):
+        r"""Left bin edges on the histogram grid"""
+        edges = [b.edges[:-1] for b in self.bins]
+        return dict(zip(self.grid, np.meshgrid(*edges, indexing="ij")))
+
+
+def add(partial, key, value):
+    if key in partial:
+        partial[key] += value
+    else:
+        partial[key] = value.copy()
+
+
+def accumulate(specs, intervals):
+    r"""Partial sums of all `specs` over a share of the intervals"""
+    partial, units = {}, {}
+    loaders = list(dict.fromkeys(spec.loader for spec in specs))
+    for interval in intervals:
+        read = Reader()
+        with stage("load", interval=interval):
+            data = {loader: loader(interval, read) for loader in loaders}
+        with stage("histogram", interval=interval):
+            for spec in specs:
+                spec.accumulate(data[spec.loader], partial, units)
+
+    return partial, units, len(intervals)
+
+
+def write(h5f, where, data):
+    if isinstance(data, u.Quantity) and data.unit != u.dimensionless_unscaled:
+        h5d = h5f.create_dataset(where, data=data.value)
+        h5d.attrs["unit"] = str(data.unit)
+    else:
+        h5f.create_dataset(where, data=np.asarray(data))
+
+
+def merge(a, b):
+    for key, value in b.items():
+        add(a, key, value)
+    return a
+
+
+def reduce_tree(partials):
+    r"""Pairwise sum of a list of partials"""
+    while len(partials) > 1:
+        partials = [
+            (
+                merge(*partials[i : i + 2])
+                if i + 1 < len(partials)
+                else partials[i]
+            )
+            for i in range(0, len(partials), 2)
+        ]
+    return partials[0] if len(partials) > 0 else {}
+
+
+def worker_inputs(specs):
+    r"""Specs and the datasets they share, to broadcast to the workers"""
+    shared = dict.fromkeys(where for spec in specs for where in spec.shared)
+    return dict(specs=specs, **{where: read_data(where) for where in shared})
+
+
+def update_task(task):
+    # Module-level, so that tasks pickle without the specs
+    return update_partials(published("specs"), *task)
+
+
+def accumulate_share(share):
+    return accumulate(published("specs"), share)
+
+
+def run_partials(specs, intervals, processes):
+    r"""
+    Update the per-interval partials in `lib.partials_file` and return the
+    totals. A partial is recomputed only if its spec or loader module
+    changed, or if the files it was read from changed and so did the
+    content of the datasets it used.
+    """
+    groups = {}
+    for i, spec in enumerate(specs):
+        groups.setdefault(spec.loader, []).append(i)
+
+    tasks = []
+    with h5.File(lib.partials_file, "a") as h5f:
+        for interval in intervals:
+            checks = []
+            for group in groups.values():
+                meta = check(h5f, [specs[i] for i in group], interval)
+                if meta != "fresh":
+                    checks.append((group, meta))
+            if len(checks) > 0:
+                tasks.append((interval, checks))
+
+        print(f"{len(tasks)}/{len(intervals)} intervals to update.")
+        # Longest intervals first, so that the pool does not end on a few
+        costs = interval_costs(intervals, where=cost_source)
+        tasks = lpt_order(tasks, costs, key=lambda task: task[0])
+        if len(tasks) > 0:
+            with broadcast(**worker_inputs(specs)) as init, Pool(
+                min(processes, len(tasks)), **init
+            ) as p:
+                for count, (interval, results) in enumerate(
+                    p.uimap(update_task, tasks), start=1
+                ):
+                    for result in results:
+                        write_partials(h5f, interval, *result)
+                    print(f"Processed {count}/{len(tasks)} files.")
+                p.close()
+                p.join()
+                p.clear()
+
+        total, units = {}, {}
+        for spec in specs:
+            for key in spec.keys:
+                total[key], _units = read_total(
+                    h5f, key, intervals, reduce_sparse
+                )
+                units.update(_units)
+
+    return total, units
+
+
+def reduce_sparse(partials):
+    return reduce_tree([{0: H} for H in partials])[0]
+
+
+def run_histograms(specs, intervals=None, processes=8, incremental=True):
+    r"""
+    Accumulate `specs` over `intervals` (all by default) in one sweep and
+    write the results to `lib.analysis_file`.
+
+    Parameters
+    ----------
+    specs: list of Histogram
+        Histogram jobs
+    intervals: list of int, optional
+        Intervals to process
+    processes: int
+        Number of worker processes
+    incremental: bool
+        Keep per-interval partials in `lib.partials_file` and only
+        recompute stale ones. Otherwise every worker reduces its share of
+        the intervals locally and returns a single partial, which are then
+        summed pairwise.
+    """
+    if intervals is None:
+        intervals = range(read_num_intervals())
+    intervals = list(dict.fromkeys(intervals))
+    if incremental:
+        total, units = run_partials(specs, intervals, processes)
+    else:
+        total, units = run_shares(specs, intervals, processes)
+
+    outputs = {}
+    for spec in specs:
+        outputs.update(spec.outputs(total, units))
+
+    with h5.File(lib.analysis_file, "a") as h5f:
+        for where in dict.fromkeys(spec.where for spec in specs):
+            if where in h5f:
+                del h5f[where]
+
+        for spec in specs:
+            if spec.grid is not None:
+                for key, value in spec.meshgrid().items():
+                    if (name := f"{spec.where}/{key}") not in h5f:
+                        write(h5f, name, value)
+
+        for key, value in outputs.items():
+            if key in units:
+                value = value * u.Unit(units[key])
+            write(h5f, key, value)
+
+
+def run_shares(specs, intervals, processes):
+    r"""
+    Totals of `specs` with every worker reducing its share of the intervals
+    locally and returning a single partial, which are then summed pairwise.
+    """
+    # Shares of about equal cost, so that the workers finish together
+    costs = interval_costs(intervals, where=cost_source)
+    shares = lpt_shares(intervals, costs, processes)
+
+    partials, units, count = [], {}, 0
+    with broadcast(**worker_inputs(specs)) as init, Pool(
+        len(shares), **init
+    ) as p:
+        for partial, _units, N in p.uimap(accumulate_share, shares):
+            partials.append(partial)
+            units.update(_units)
+            count += N
+            print(f"Processed {count}/{len(intervals)} files.")
+        # Fresh workers on the next call, which may use other loaders
+        p.close()
+        p.join()
+        p.clear()
+
+    return reduce_tree(partials), units
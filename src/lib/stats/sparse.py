@@ -0,0 +1,138 @@
+r"""Histograms stored as the touched cells of a large grid"""
+
+__all__ = ["SparseHistogram"]
+
+import numpy as np
+
+from .histogram import bin_index
+
+
+class SparseHistogram:
+    r"""
+    Counts and weighted sums on the touched cells of a grid, in COO form:
+    sorted unique flat indices with one count and one sum per channel each.
+    Cells are summed in the same order as the dense accumulation, so that
+    `dense()` is identical to adding the dense histograms.
+
+    Parameters
+    ----------
+    shape: tuple
+        Shape of the grid
+    index: int64 array, shape (M,)
+        Sorted flat indices of the touched cells
+    counts: array_like, shape (M,)
+        Counts
+    sums: array_like, shape (M, C)
+        Weighted sums
+    M2: array_like, shape (M, C), optional
+        Sums of squared deviations from the mean of each channel, merged
+        with the parallel algorithm of Chan et al. (1979)
+    """
+
+    def __init__(self, shape, index, counts, sums, M2=None):
+        self.shape = tuple(shape)
+        self.index = index
+        self.counts = counts
+        self.sums = sums
+        self.M2 = M2
+
+    @classmethod
+    def from_samples(cls, sample, bins, weights=None, moments=False):
+        r"""
+        Same arguments as `lib.stats.histogramdd`, with `moments` to also
+        keep the variance of each weight channel.
+        """
+        index, shape = bin_index(sample, bins)
+        valid = index >= 0
+        weights = np.empty((len(index), 0)) if weights is None else weights
+        weights = np.asarray(weights, dtype="f8")[valid]
+        index, inverse = np.unique(index[valid], return_inverse=True)
+        counts = np.bincount(inverse).astype("f8")
+
+        sums = np.empty((len(index), weights.shape[1]))
+        for c in range(weights.shape[1]):
+            sums[:, c] = np.bincount(inverse, weights=weights[:, c])
+
+        M2 = None
+        if moments:
+            mean = sums / counts[:, None]
+            M2 = np.empty_like(sums)
+            for c in range(weights.shape[1]):
+                delta = weights[:, c] - mean[inverse, c]
+                M2[:, c] = np.bincount(inverse, weights=delta**2)
+
+        return cls(shape, index, counts, sums, M2)
+
+    def __iadd__(self, other):
+        index, inverse = np.unique(
+            np.concatenate((self.index, other.index)), return_inverse=True
+        )
+        counts = np.concatenate((self.counts, other.counts))
+        sums = np.concatenate((self.sums, other.sums))
+        self.counts = np.bincount(inverse, weights=counts)
+        self.sums = np.empty((len(index), sums.shape[1]))
+        for c in range(sums.shape[1]):
+            self.sums[:, c] = np.bincount(inverse, weights=sums[:, c])
+
+        if self.M2 is not None:
+            # M2 = sum_i M2_i + n_i (mean_i - mean)^2 over merged cells
+            delta = (
+                sums / counts[:, None]
+                - (self.sums / self.counts[:, None])[inverse]
+            )
+            M2 = (
+                np.concatenate((self.M2, other.M2))
+                + counts[:, None] * delta**2
+            )
+            self.M2 = np.empty_like(self.sums)
+            for c in range(sums.shape[1]):
+                self.M2[:, c] = np.bincount(inverse, weights=M2[:, c])
+
+        self.index = index
+        return self
+
+    def copy(self):
+        return SparseHistogram(
+            self.shape,
+            self.index.copy(),
+            self.counts.copy(),
+            self.sums.copy(),
+            None if self.M2 is None else self.M2.copy(),
+        )
+
+    @property
+    def nbytes(self):
+        M2 = 0 if self.M2 is None else self.M2.nbytes
+        return self.index.nbytes + self.counts.nbytes + self.sums.nbytes + M2
+
+    def dense(self):
+        r"""
+        Return
+        ------
+        H: array_like, shape (n_1, ..., n_D)
+            Counts
+        H_w: array_like, shape (n_1, ..., n_D, C)
+            Weighted sums
+        """
+        size = int(np.prod(self.shape))
+        H = np.zeros(size)
+        H[self.index] = self.counts
+        H_w = np.zeros((size, self.sums.shape[1]))
+        H_w[self.index] = self.sums
+        return H.reshape(self.shape), H_w.reshape(*self.shape, -1)
+
+    def moments(self):
+        r"""
+        Return
+        ------
+        mean: array_like, shape (n_1, ..., n_D, C)
+            Mean of each weight channel, NaN in empty cells
+        std: array_like, shape (n_1, ..., n_D, C)
+            Population standard deviation of each weight channel
+        """
+        size = int(np.prod(self.shape))
+        mean = np.full((size, self.sums.shape[1]), np.nan)
+        std = np.full((size, self.sums.shape[1]), np.nan)
+        mean[self.index] = self.sums / self.counts[:, None]
+        std[self.index] = np.sqrt(self.M2 / self.counts[:, None])
+        return mean.reshape(*self.shape, -1), std.reshape(*self.shape, -1)
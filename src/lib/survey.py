@@ -0,0 +1,273 @@
+r"""
+Lazy dask/xarray view of the per-interval datasets over the whole survey,
+for exploratory analysis. Needs the optional dask and xarray packages.
+
+    from lib.survey import histogram, survey
+
+    N = survey["mms1/ion-fpi-moms/N"]
+    R = survey["postprocess/barycenter_fpi/R"]
+    X, Z = R[:, 0].where(N > 0.05), R[:, 2]
+    H = histogram((X, Z), (X_bins, Z_bins))
+
+Arrays combined in one expression must have the same rows, e.g. FPI
+moments and barycentric quantities at FPI times of the same intervals.
+Resampling by rows, e.g. `B.coarsen(time=16, boundary="trim").mean()`,
+stays lazy. Arrays are read a chunk at a time when computed, with the
+dask scheduler in use, e.g. `dask.config.set(scheduler="processes")`.
+"""
+
+__all__ = [
+    "Survey",
+    "survey",
+    "interval_path",
+    "reduce_blocks",
+    "histogram",
+]
+
+import operator
+
+import astropy.units as u
+import h5py as h5
+import numpy as np
+
+import lib
+from lib.stats import Bins, histogramdd
+from lib.utils import read_num_intervals, read_trange
+
+try:
+    import dask
+    import dask.array as da
+    import xarray as xr
+except ImportError as e:
+    raise ImportError(
+        "lib.survey needs dask and xarray, e.g. pip install dask xarray"
+    ) from e
+
+# Rows per chunk; a chunk never spans two intervals
+chunk_rows = 2**17
+
+
+def interval_path(where, interval):
+    r"""
+    Dataset of `lib.data_file` holding survey path `where` for one interval,
+    e.g. "mms1/fgm/B_gsm" -> "mms1/fgm/interval_0/B_gsm" and
+    "postprocess/barycenter/R_bc" -> "postprocess/interval_0/barycenter/R_bc".
+    Paths with `{}` are formatted with the interval instead.
+    """
+    if "{}" in where:
+        return where.format(interval)
+    parts = where.strip("/").split("/")
+    # Probe and instrument groups, or a single one, e.g. "omni"
+    k = 2 if parts[0].startswith("mms") else 1
+    return "/".join([*parts[:k], f"interval_{interval}", *parts[k:]])
+
+
+def rows(layout):
+    return [(interval, shape[0]) for interval, _, shape, _, _ in layout]
+
+
+class Source:
+    r"""Dataset of `lib.data_file` read on demand, one slice at a time"""
+
+    def __init__(self, where, shape, dtype):
+        self.where = where
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.ndim = len(shape)
+
+    def __getitem__(self, index):
+        with h5.File(lib.data_file, "r") as h5f:
+            return h5f[self.where][index]
+
+
+class Survey:
+    r"""
+    Lazy arrays spanning the survey intervals, indexed by survey path (see
+    `interval_path`). Each is a `xarray.DataArray` of a dask array chunked
+    along the "time" dimension, with the interval of each row as the
+    "interval" coordinate and the times as the "t" coordinate. The bounds
+    of the intervals are in `bounds`.
+
+    Parameters
+    ----------
+    intervals: list of int, optional
+        Intervals to span; defaults to all. Intervals without a dataset are
+        left out of its array.
+    """
+
+    def __init__(self, intervals=None):
+        if intervals is None:
+            intervals = range(read_num_intervals())
+        self.intervals = list(intervals)
+        trange = read_trange(self.intervals, dtype="datetime64[ns]")
+        self.bounds = xr.Dataset(
+            dict(
+                start=("interval", trange[:, 0]),
+                stop=("interval", trange[:, 1]),
+            ),
+            coords=dict(interval=self.intervals),
+        )
+        self.arrays = {}
+
+    def __getitem__(self, where):
+        if where not in self.arrays:
+            self.arrays[where] = self.get(where)
+        return self.arrays[where]
+
+    def layout(self, where):
+        r"""(interval, dataset, shape, dtype, unit) of non-empty intervals"""
+        layout = []
+        with h5.File(lib.data_file, "r") as h5f:
+            for interval in self.intervals:
+                path = interval_path(where, interval)
+                if path not in h5f or h5f[path].shape[0] == 0:
+                    continue
+                h5d = h5f[path]
+                unit = h5d.attrs.get("unit")
+                layout.append((interval, path, h5d.shape, h5d.dtype, unit))
+        return layout
+
+    def concat(self, layout):
+        # Rows of all intervals and the interval of each row
+        blocks, intervals = [], []
+        for interval, path, shape, dtype, _ in layout:
+            blocks.append(
+                da.from_array(
+                    Source(path, shape, dtype),
+                    chunks=(chunk_rows, *shape[1:]),
+                    name=f"survey-{lib.data_file}-{path}",
+                    meta=np.empty((0,) * len(shape), dtype=dtype),
+                )
+            )
+            intervals.append(
+                da.full(shape[0], interval, dtype="i8", chunks=chunk_rows)
+            )
+        return da.concatenate(blocks), da.concatenate(intervals)
+
+    def get(self, where, time=None):
+        r"""
+        Lazy array of `where` over the survey.
+
+        Parameters
+        ----------
+        where: str
+            Survey path, e.g. "mms1/ion-fpi-moms/N"
+        time: str, optional
+            Survey path of the times of the rows; defaults to "t" in the
+            same group, if it has the same rows
+
+        Return
+        ------
+        array: xarray.DataArray
+            With the unit, if any, in `attrs["unit"]`
+        """
+        layout = self.layout(where)
+        if len(layout) == 0:
+            raise KeyError(f"No interval has {where}")
+
+        data, intervals = self.concat(layout)
+        dims = ["time"] + [f"dim_{k}" for k in range(1, data.ndim)]
+        coords = dict(interval=("time", intervals))
+        if time is None:
+            time = f"{where.rsplit('/', 1)[0]}/t"
+        if time != where and rows(self.layout(time)) == rows(layout):
+            t, _ = self.concat(self.layout(time))
+            coords["t"] = ("time", t.astype("datetime64[ns]"))
+
+        unit = layout[0][4]
+        attrs = {} if unit is None else dict(unit=unit)
+        return xr.DataArray(
+            data, dims=dims, coords=coords, name=where, attrs=attrs
+        )
+
+
+def reduce_blocks(func, *arrays, combine=operator.add, **compute):
+    r"""
+    Parallel reduction over the chunks of lazy arrays: `func` is applied to
+    the aligned chunks of `arrays`, as numpy arrays, and the results are
+    combined pairwise.
+
+    Parameters
+    ----------
+    func: callable
+        `func(*blocks)` returns the partial result of one chunk
+    arrays: xarray.DataArray or dask.array.Array
+        Arrays of the same rows and chunks along the first axis, e.g. from
+        the same instrument
+    combine: callable
+        Combines two partial results
+    compute: optional
+        Keywords of `dask.compute`, e.g. scheduler="processes"
+
+    Return
+    ------
+    result:
+        Combined result of all chunks
+    """
+    arrays = [getattr(a, "data", a) for a in arrays]
+    if any(a.chunks[0] != arrays[0].chunks[0] for a in arrays):
+        raise ValueError("Arrays are not chunked alike along the first axis")
+    # One block per chunk of rows
+    arrays = [a.rechunk({k: -1 for k in range(1, a.ndim)}) for a in arrays]
+    blocks = [a.to_delayed().reshape(a.numblocks[0]) for a in arrays]
+
+    partials = [dask.delayed(func)(*chunk) for chunk in zip(*blocks)]
+    while len(partials) > 1:
+        partials = [
+            (
+                dask.delayed(combine)(partials[i], partials[i + 1])
+                if i + 1 < len(partials)
+                else partials[i]
+            )
+            for i in range(0, len(partials), 2)
+        ]
+    return dask.compute(partials[0], **compute)[0]
+
+
+def histogram(sample, bins, weights=None, **compute):
+    r"""
+    Counts and weighted sums of lazy survey arrays on a grid, computed chunk
+    by chunk as in `lib.stats.histogramdd`. Samples that are NaN, e.g.
+    masked with `DataArray.where`, are not counted.
+
+    Parameters
+    ----------
+    sample: sequence of D xarray.DataArray
+        Coordinates of the samples, in the unit of their `attrs["unit"]`
+    bins: sequence of D Bins or array_like
+        Bin edges along each axis
+    weights: sequence of xarray.DataArray, optional
+        Weight channels
+    compute: optional
+        Keywords of `dask.compute`
+
+    Return
+    ------
+    H: array_like, shape (n_1, ..., n_D)
+        Counts
+    H_w: array_like, shape (n_1, ..., n_D, C)
+        Weighted sums, only if `weights` is given
+    """
+    bins = [b if isinstance(b, Bins) else Bins(b) for b in bins]
+    units = [getattr(x, "attrs", {}).get("unit") for x in sample]
+    D = len(sample)
+
+    def block(*arrays):
+        x = [
+            a if unit is None else a * u.Unit(unit)
+            for a, unit in zip(arrays[:D], units)
+        ]
+        w = np.stack(arrays[D:], axis=1) if len(arrays) > D else None
+        return histogramdd(x, bins, weights=w)
+
+    def combine(a, b):
+        if isinstance(a, tuple):
+            return tuple(x + y for x, y in zip(a, b))
+        return a + b
+
+    arrays = [*sample, *(weights or [])]
+    return reduce_blocks(block, *arrays, combine=combine, **compute)
+
+
+# Survey of all intervals, e.g. survey["mms1/ion-fpi-moms/N"]
+survey = Survey()
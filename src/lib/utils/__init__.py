@@ -1,3 +1,32 @@
-from .reader import (read_data, read_event_interval, read_num_intervals,
-                     read_trange)
-from .writer import write_data
+from lib import lazy
+
+# Submodule of each name, imported on first use
+exports = dict(
+    SharedArrays="shared",
+    broadcast="shared",
+    published="shared",
+    event_catalog="catalog",
+    peak_rss="instrument",
+    read_report="instrument",
+    rss="instrument",
+    stage="instrument",
+    staged="instrument",
+    summarize="instrument",
+    read_data="reader",
+    read_event_interval="reader",
+    read_index="reader",
+    read_num_intervals="reader",
+    read_size="reader",
+    read_source="reader",
+    read_trange="reader",
+    sampling_period="reader",
+    interval_costs="schedule",
+    lpt_order="schedule",
+    lpt_shares="schedule",
+    split_rows="schedule",
+    split_tasks="schedule",
+    append_data="writer",
+    write_data="writer",
+)
+__all__ = list(exports)
+__getattr__, __dir__ = lazy(__name__, exports)
@@ -0,0 +1,51 @@
+r"""Map UTC event windows to the rows of per-interval datasets"""
+
+__all__ = ["event_catalog"]
+
+import numpy as np
+
+from .reader import read_index, read_trange
+
+
+def event_catalog(windows, where="mms1/ion-fpi-moms/interval_{}/t"):
+    r"""
+    Locate event windows in the survey intervals by bisecting their time
+    datasets, so that only the rows inside the windows need to be read.
+    Where intervals overlap, the shared rows go to the first interval.
+
+    Parameters
+    ----------
+    windows: datetime64 array, shape (M, 2)
+        Start and stop of each event, both included
+    where: str
+        Time dataset of an interval, formatted with the interval number
+
+    Return
+    ------
+    catalog: dict
+        List of (event, rows) for each interval holding part of an event,
+        with `rows` a slice of the datasets sharing the time of `where`
+    """
+    windows = np.asarray(windows).astype("datetime64[ns]").astype("f8")
+    trange = read_trange(slice(None), dtype="datetime64[ns]").astype("f8")
+    # Intervals are sorted by start; the end covered so far is monotonic
+    covered = np.maximum.accumulate(trange[:, 1])
+
+    catalog = {}
+    for event, (start, stop) in enumerate(windows):
+        first = np.searchsorted(covered, start, side="left")
+        last = np.searchsorted(trange[:, 0], stop, side="right")
+        for interval in range(first, last):
+            if trange[interval, 1] < start:
+                continue
+
+            t = where.format(interval)
+            i = read_index(t, start, side="left")
+            if interval > 0:
+                i = max(i, read_index(t, covered[interval - 1], "right"))
+            j = read_index(t, stop, side="right")
+            if i < j:
+                rows = slice(int(i), int(j))
+                catalog.setdefault(int(interval), []).append((event, rows))
+
+    return catalog
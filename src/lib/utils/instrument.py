@@ -0,0 +1,200 @@
+r"""Wall time, CPU time, memory and I/O of named stages of the scripts"""
+
+__all__ = [
+    "stage",
+    "staged",
+    "report_file",
+    "read_report",
+    "summarize",
+    "rss",
+    "peak_rss",
+]
+
+import functools
+import inspect
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import lib
+
+# Report of every stage, appended to by all processes; recording is off
+# unless MMS_SURVEY_PROFILE is set to "1" or to the path of the report
+profile = os.environ.get("MMS_SURVEY_PROFILE", "")
+if profile in ["", "0"]:
+    report_file = None
+elif profile == "1":
+    report_file = lib.data_dir / "profile.jsonl"
+else:
+    report_file = Path(profile)
+# Names and labels of the stages open in this process
+stack = []
+disabled = nullcontext()
+# Bytes per unit of ru_maxrss: bytes on macOS, kB on Linux
+maxrss_unit = 1 if sys.platform == "darwin" else 1024
+
+
+def rss():
+    # Resident memory of this process, None where /proc is unavailable
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss():
+    # Peak resident memory of the process up to now
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * maxrss_unit
+
+
+def io_counters():
+    # Bytes read and written by this process, cache hits included
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(":") for line in f)
+    except OSError:
+        return 0, 0
+    return int(fields["rchar"]), int(fields["wchar"])
+
+
+@contextmanager
+def record(name, labels):
+    parent = stack[-1] if len(stack) > 0 else ("", {})
+    labels = {**parent[1], **labels}
+    stack.append((f"{parent[0]}/{name}".lstrip("/"), labels))
+    read, written = io_counters()
+    wall, cpu, start = time.perf_counter(), time.process_time(), time.time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        read = io_counters()[0] - read
+        written = io_counters()[1] - written
+        entry = dict(
+            stage=stack.pop()[0],
+            **labels,
+            pid=os.getpid(),
+            start=start,
+            wall=wall,
+            cpu=cpu,
+            rss=rss(),
+            peak_rss=peak_rss(),
+            read=read,
+            written=written,
+        )
+        # A single write per line, so that workers do not interleave
+        line = json.dumps(entry, default=str) + "\n"
+        fd = os.open(report_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+
+
+def stage(name, **labels):
+    r"""
+    Context manager recording the wall and CPU time, resident and peak
+    memory, and bytes read and written of a stage to `report_file`. Nested
+    stages are named by their path, e.g. "fgm/download", and inherit the
+    labels of the enclosing ones. Does nothing when recording is off.
+
+    Parameters
+    ----------
+    name: str
+        Stage name
+    labels: optional
+        Keys of the record, e.g. probe=1, interval=418
+    """
+    if report_file is None:
+        return disabled
+    return record(name, labels)
+
+
+def staged(name=None, labels=("probe", "interval", "species", "part")):
+    r"""
+    Decorator recording each call of a function as a stage named after it,
+    labelled with its arguments named in `labels`. Functions are returned
+    as they are when recording is off.
+    """
+
+    def decorator(func):
+        if report_file is None:
+            return func
+
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = {
+                key: bound.arguments[key]
+                for key in labels
+                if key in bound.arguments
+            }
+            with record(name or func.__name__, values):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def read_report(path=None):
+    r"""Records of a report, `report_file` by default"""
+    path = path or report_file or lib.data_dir / "profile.jsonl"
+    entries = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Line of a worker killed while writing
+                continue
+    return entries
+
+
+def summarize(path=None, by=("stage",)):
+    r"""
+    Totals of a report per stage (or other keys), largest wall time first.
+
+    Parameters
+    ----------
+    path: path, optional
+        Report to read; defaults to `report_file`
+    by: tuple of str
+        Keys grouping the records, e.g. ("stage", "probe")
+
+    Return
+    ------
+    summary: list of dict
+        Count, total wall and CPU times, largest peak memory, and total
+        bytes read and written of each group
+    """
+    groups = {}
+    for entry in read_report(path):
+        key = tuple(entry.get(k) for k in by)
+        groups.setdefault(key, []).append(entry)
+
+    summary = []
+    for key, entries in groups.items():
+        total = {
+            stat: sum(entry[stat] for entry in entries)
+            for stat in ["wall", "cpu", "read", "written"]
+        }
+        summary.append(
+            dict(
+                zip(by, key),
+                count=len(entries),
+                **total,
+                peak_rss=max(entry["peak_rss"] for entry in entries),
+            )
+        )
+    return sorted(summary, key=lambda row: -row["wall"])
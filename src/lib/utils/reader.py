@@ -2,9 +2,16 @@ __all__ = [
     "read_trange",
     "read_num_intervals",
     "read_data",
+    "read_size",
+    "sampling_period",
+    "read_index",
+    "read_source",
     "read_event_interval",
 ]
 
+import functools
+from bisect import bisect_left, bisect_right
+
 import astropy.units as u
 import h5py as h5
 import numpy as np
@@ -12,30 +19,30 @@ import numpy as np
 import lib
 
 
-def read_trange(interval, dtype=str):
+@functools.cache
+def interval_table():
+    # Read once per process; forked pool workers inherit it
     trange = (
         np.loadtxt(lib.resource_dir / "intervals.csv", delimiter=",")
         .astype("datetime64[s]")
         .astype("datetime64[ns]")
     )
+    trange.flags.writeable = False
+    return trange
+
+
+def read_trange(interval, dtype=str):
+    trange = interval_table()
     return trange[interval, :].astype(dtype)
 
 
 def read_num_intervals():
-    trange = (
-        np.loadtxt(lib.resource_dir / "intervals.csv", delimiter=",")
-        .astype("datetime64[s]")
-        .astype("datetime64[ns]")
-    )
+    trange = interval_table()
     return trange.shape[0]
 
 
 def read_event_interval(event):
-    trange = (
-        np.loadtxt(lib.resource_dir / "intervals.csv", delimiter=",")
-        .astype("datetime64[s]")
-        .astype("datetime64[ns]")
-    )
+    trange = interval_table()
     events = np.loadtxt(
         lib.resource_dir / "turbulent_events.csv",
         delimiter=",",
@@ -53,10 +60,41 @@ def read_event_interval(event):
         return idx[0]
 
 
-def read_data(where):
+def read_data(where, index=slice(None)):
     h5f = h5.File(lib.data_file, "r")
-    data = h5f[where][:]
+    data = h5f[where][index]
     if "unit" in h5f[where].attrs:
         data *= u.Unit(h5f[where].attrs["unit"])
 
     return data
+
+
+def read_size(where):
+    h5f = h5.File(lib.data_file, "r")
+    return h5f[where].shape[0]
+
+
+def sampling_period(where):
+    r"""Mean of np.diff(t) of a time dataset without reading it whole."""
+    N = read_size(where)
+    t0, t1 = read_data(where, [0, N - 1])
+    return ((t1 - t0) / (N - 1) * u.ns).to(u.s)
+
+
+def read_index(where, value, side="left"):
+    r"""Bisect a sorted 1-D dataset on disk without reading it whole."""
+    h5f = h5.File(lib.data_file, "r")
+    bisect = bisect_left if side == "left" else bisect_right
+    return bisect(h5f[where], value)
+
+
+def read_source(where):
+    r"""File behind the external link of lib.data_file holding `where`."""
+    h5f = h5.File(lib.data_file, "r")
+    parts = where.strip("/").split("/")
+    for i in range(1, len(parts) + 1):
+        link = h5f.get("/".join(parts[:i]), getlink=True)
+        if isinstance(link, h5.ExternalLink):
+            return link.filename
+
+    return str(lib.data_file)
@@ -0,0 +1,133 @@
+r"""Largest-first ordering and splitting of per-interval work"""
+
+__all__ = [
+    "interval_costs",
+    "lpt_order",
+    "lpt_shares",
+    "split_tasks",
+    "split_rows",
+]
+
+import heapq
+
+import numpy as np
+
+from .reader import interval_table, read_num_intervals, read_size
+
+
+def interval_costs(intervals=None, where=None):
+    r"""
+    Estimated cost of processing each interval, for scheduling.
+
+    Parameters
+    ----------
+    intervals: list of int, optional
+        Intervals to estimate; defaults to all
+    where: str, optional
+        Dataset with `{}` in place of the interval, e.g.
+        "mms1/fgm/interval_{}/t", whose number of rows is the cost. Intervals
+        without it are costed by their duration at the median rate of the
+        others. Without `where`, the cost is the duration in seconds.
+
+    Return
+    ------
+    costs: dict
+        Interval to cost
+    """
+    if intervals is None:
+        intervals = range(read_num_intervals())
+    intervals = list(intervals)
+    trange = interval_table()[intervals].astype("f8") / 1e9
+    durations = trange[:, 1] - trange[:, 0]
+    costs = durations
+    if where is not None:
+        rows = np.full(len(intervals), np.nan)
+        for i, interval in enumerate(intervals):
+            try:
+                rows[i] = read_size(where.format(interval))
+            except (KeyError, OSError):
+                # Not collected yet
+                continue
+
+        known = np.isfinite(rows) & (durations > 0)
+        rate = np.median(rows[known] / durations[known]) if known.any() else 1
+        costs = np.where(np.isfinite(rows), rows, rate * durations)
+
+    return dict(zip(intervals, costs.tolist()))
+
+
+def lpt_order(items, costs, key=None):
+    r"""
+    Items by decreasing cost (longest processing time first), so that a
+    pool does not end on a few long tasks while the other workers idle.
+    Items of equal cost keep their order.
+
+    Parameters
+    ----------
+    items: iterable
+        Tasks, e.g. intervals or (probe, interval) tuples
+    costs: dict
+        Cost of `key(item)`, see `interval_costs`
+    key: callable, optional
+        Maps an item to its key in `costs`; defaults to the item itself
+    """
+    key = key or (lambda item: item)
+    return sorted(items, key=lambda item: -costs[key(item)])
+
+
+def lpt_shares(items, costs, n, key=None):
+    r"""
+    Split items into at most `n` shares of about equal total cost, each item,
+    largest first, going to the least loaded share.
+    """
+    key = key or (lambda item: item)
+    loads = [(0.0, i) for i in range(n)]
+    shares = [[] for _ in range(n)]
+    for item in lpt_order(items, costs, key=key):
+        load, i = heapq.heappop(loads)
+        shares[i].append(item)
+        heapq.heappush(loads, (load + costs[key(item)], i))
+
+    return [share for share in shares if len(share) > 0]
+
+
+def split_tasks(intervals, costs, max_cost=None):
+    r"""
+    Tasks `(interval, part, parts)` by decreasing cost, with each interval
+    costing more than `max_cost` split into equal parts whose results are
+    merged afterwards (see `split_rows`).
+
+    Parameters
+    ----------
+    intervals: list of int
+    costs: dict
+        Interval to cost, see `interval_costs`
+    max_cost: float, optional
+        Largest cost of a task; intervals are not split by default
+
+    Return
+    ------
+    tasks: list of tuple
+    """
+    tasks, task_costs = [], {}
+    for interval in intervals:
+        parts = 1
+        if max_cost is not None:
+            parts = max(int(np.ceil(costs[interval] / max_cost)), 1)
+        for part in range(parts):
+            tasks.append(task := (interval, part, parts))
+            task_costs[task] = costs[interval] / parts
+
+    return lpt_order(tasks, task_costs)
+
+
+def split_rows(size, part, parts, step=1):
+    r"""
+    Rows [start, stop) of `part` out of `parts` of a dataset of `size` rows,
+    split on multiples of `step`, e.g. the chunk size of a script so that
+    split and whole intervals give the same results.
+    """
+    blocks = -(-size // step)
+    start = min(part * blocks // parts * step, size)
+    stop = min((part + 1) * blocks // parts * step, size)
+    return start, stop
@@ -0,0 +1,147 @@
+r"""Read-only inputs published once to the workers of a pool"""
+
+__all__ = [
+    "SharedArrays",
+    "broadcast",
+    "published",
+]
+
+import os
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import astropy.units as u
+import numpy as np
+
+# Objects published to this process, by name
+workspace = {}
+# Byte alignment of the arrays in a block
+align = 64
+
+
+class SharedArrays:
+    r"""
+    Arrays (or Quantities) copied once into a shared memory block. Instances
+    pickle to the name and layout of the block and unpickle as read-only
+    views of it, so that sending them to a worker copies no data.
+
+    Parameters
+    ----------
+    arrays: dict
+        Name to array; object arrays cannot be shared
+    """
+
+    def __init__(self, arrays):
+        self.layout, values, size = {}, {}, 0
+        for key, value in arrays.items():
+            unit = None
+            if isinstance(value, u.Quantity):
+                unit, value = str(value.unit), value.value
+            value = np.asarray(value)
+            if value.dtype.hasobject:
+                raise TypeError(f"Cannot share object array {key!r}")
+            self.layout[key] = (size, value.shape, value.dtype.str, unit)
+            values[key] = value
+            size += -(-value.nbytes // align) * align
+
+        self.block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.owner = True
+        self.pid = os.getpid()
+        self.views = {}
+        for key, value in values.items():
+            offset, shape, dtype, _ = self.layout[key]
+            np.ndarray(shape, dtype, self.block.buf, offset)[...] = value
+
+    def __getitem__(self, key):
+        if key not in self.views:
+            offset, shape, dtype, unit = self.layout[key]
+            view = np.ndarray(shape, dtype, self.block.buf, offset)
+            view.flags.writeable = False
+            self.views[key] = view if unit is None else view << u.Unit(unit)
+        return self.views[key]
+
+    def __contains__(self, key):
+        return key in self.layout
+
+    def keys(self):
+        return self.layout.keys()
+
+    def __getstate__(self):
+        return dict(name=self.block.name, layout=self.layout, pid=self.pid)
+
+    def __setstate__(self, state):
+        self.block = shared_memory.SharedMemory(name=state["name"])
+        # Spawned workers of pathos pools start their own resource tracker,
+        # which would free the block when they exit
+        if os.getpid() != state["pid"]:
+            resource_tracker.unregister(self.block._name, "shared_memory")
+        self.layout = state["layout"]
+        self.owner = False
+        self.pid = state["pid"]
+        self.views = {}
+
+    def close(self):
+        r"""Detach from the block, and free it if this process made it"""
+        self.views.clear()
+        try:
+            self.block.close()
+        except BufferError:
+            # Views still in use; the mapping goes when they do
+            pass
+        if self.owner:
+            self.block.unlink()
+
+
+def publish(objects):
+    r"""Pool initializer making `objects` available through `published`"""
+    for key, value in objects.items():
+        workspace[key] = (
+            value[key] if isinstance(value, SharedArrays) else value
+        )
+
+
+def published(key, default=None):
+    r"""Object published to this process by `broadcast` under `key`"""
+    return workspace.get(key, default)
+
+
+@contextmanager
+def broadcast(**objects):
+    r"""
+    Publish read-only inputs to the workers of a pool once per worker rather
+    than with every task. Arrays are copied into one shared memory block that
+    workers view without copying; other objects, e.g. histogram specs, are
+    sent as they are. The objects are also published in this process, so
+    that tasks run the same without a pool.
+
+        with broadcast(specs=specs, timeline=timeline) as init:
+            with Pool(processes, **init) as p:
+                p.uimap(task, items)
+
+    where `task` is a module-level function reading `published("specs")`.
+
+    Parameters
+    ----------
+    objects:
+        Name to object
+
+    Return
+    ------
+    init: dict
+        Initializer arguments of a pool
+    """
+    arrays = {k: v for k, v in objects.items() if isinstance(v, np.ndarray)}
+    shared = SharedArrays(arrays) if len(arrays) > 0 else None
+    payload = {
+        key: shared if key in arrays else v for key, v in objects.items()
+    }
+
+    previous = dict(workspace)
+    publish(payload)
+    try:
+        yield dict(initializer=publish, initargs=(payload,))
+    finally:
+        workspace.clear()
+        workspace.update(previous)
+        if shared is not None:
+            shared.close()
@@ -1,4 +1,4 @@
-__all__ = ["write_data"]
+__all__ = ["write_data", "append_data"]
 
 import astropy.units as u
 import h5py as h5
@@ -6,14 +6,17 @@ import numpy as np
 
 import lib
 
+from .instrument import stage
+
 
 def write_data(probe, interval, instrument, data, where=None):
     fname = f"{lib.h5_dir}/mms{probe}/{instrument}/interval_{interval}.h5"
     h5f = h5.File(fname, "a")
 
     if isinstance(data, dict):
-        for key, value in data.items():
-            write_data(probe, interval, instrument, value, where=key)
+        with stage("write", probe=probe, interval=interval):
+            for key, value in data.items():
+                write_data(probe, interval, instrument, value, where=key)
     elif isinstance(data, np.ndarray):
         if where in h5f:
             del h5f[where]
@@ -22,3 +25,19 @@ def write_data(probe, interval, instrument, data, where=None):
             h5d.attrs["unit"] = str(data.unit)
         else:
             h5f.create_dataset(where, data=data)
+
+
+def append_data(h5f, where, data):
+    r"""Append rows to a resizable dataset, creating it on first call."""
+    value = data.value if isinstance(data, u.Quantity) else np.asarray(data)
+    if where not in h5f:
+        h5d = h5f.create_dataset(
+            where, data=value, maxshape=(None, *value.shape[1:]), chunks=True
+        )
+        if isinstance(data, u.Quantity):
+            h5d.attrs["unit"] = str(data.unit)
+    else:
+        h5d = h5f[where]
+        size = h5d.shape[0]
+        h5d.resize(size + value.shape[0], axis=0)
+        h5d[size:] = value